@@ -1,263 +1,709 @@
+import csv
 import queue
 import threading
-from collections import defaultdict
-from concurrent.futures import as_completed, ThreadPoolExecutor
+from collections import defaultdict, deque, OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import as_completed, ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import repeat
 import pymupdf
 import re
 import os
 import pandas as pd
-import unicodedata
-from fuzzywuzzy import process
 from tqdm import tqdm
 import time
 import logging
+import argparse
+import textCache
+from pipelineProfile import FileProfile, PipelineProfile
+from bulletinManifest import BulletinManifest, manifest_path, bulletin_from_path
+from countyResolver import resolver, resolve_county, format_stats
+from parseLedger import ParseLedger, LEDGER_FILENAME, ledger_path, source_id, file_sha256
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+
 # Step 1: Extract text from the PDF
-ROMANIAN_COUNTIES = [
-    "Alba", "Arad", "Argeș", "Bacău", "Bihor", "Bistrița-Năsăud", "Botoșani", "Brăila", "Brașov", "București",
-    "Buzău", "Călărași", "Caraș-Severin", "Cluj", "Constanța", "Covasna", "Dâmbovița", "Dolj", "Galați", "Giurgiu",
-    "Gorj", "Harghita", "Hunedoara", "Ialomița", "Iași", "Ilfov", "Maramureș", "Mehedinți", "Mureș", "Neamț", "Olt",
-    "Prahova", "Sălaj", "Satu Mare", "Sibiu", "Suceava", "Teleorman", "Timiș", "Tulcea", "Vâlcea", "Vaslui", "Vrancea"
-]
+def iter_pdf_pages(file_path, profile=None):
+    """Text of each page in order, so only one page is held in memory at a time"""
+    open_pdf = pymupdf.open if profile is None else profile.timed("pdf_open", pymupdf.open)
+    get_text = pymupdf.Page.get_text if profile is None else profile.timed("get_text", pymupdf.Page.get_text)
+    with open_pdf(file_path) as pdf_document:
+        for page in pdf_document:
+            yield get_text(page)
 
 
 def extract_text_from_pdf(file_path):
     try:
-        text = ""
-        pdf_document = pymupdf.open(file_path)
-        for page_num in range(len(pdf_document)):
-            page = pdf_document.load_page(page_num)
-            text += page.get_text()
-        return text
+        return "".join(iter_pdf_pages(file_path))
     except Exception as e:
         logging.error(f"Error extracting text from PDF {file_path}: {str(e)}")
         return None
 
 
-def normalize_text(text):
-    """Change diacritics to their base form and convert to lowercase"""
-    return ''.join(c for c in unicodedata.normalize('NFD', text)
-                   if unicodedata.category(c) != 'Mn')
-
-
-def get_best_match_county(county):
-    """Find the best match for a county name using fuzzy string matching"""
-    if not county:
-        return None
-    normalized_county = normalize_text(county)
-    normalized_counties = [normalize_text(c) for c in ROMANIAN_COUNTIES]
-    best_match = process.extractOne(normalized_county, normalized_counties)
-    if best_match and best_match[1] >= 80:  # 80% similarity threshold
-        return ROMANIAN_COUNTIES[normalized_counties.index(best_match[0])]
-    return None
+def bulletin_pages(file_path, sha256=None, text_cache_dir=None, profile=None):
+    """Page texts of a bulletin, read from the text cache when it has them (see textCache.py)"""
+    if text_cache_dir is None:
+        return iter_pdf_pages(file_path, profile)
+    return textCache.cached_pages(text_cache_dir, sha256 or file_sha256(file_path),
+                                  lambda: iter_pdf_pages(file_path, profile))
+
+
+# Step 2: Split the bulletin into decisions and extract their fields in a single pass
+DECISION_START = "R O M Â N I A"
+DECISION_DATE_PATTERN = re.compile(r"Data:\s*(\d{2}\.\d{2}\.\d{4})")
+
+# One scan over a decision finds every label a field is read from
+LABEL_PATTERN = re.compile(r"DOSAR NR\.|ÎNCHEIERE nr\.|Firma:|Sediul:|de pe lângă Tribunalul |"
+                           r"Cod unic de înregistrare:|Număr de ordine în registrul comerțului:|"
+                           r"Identificator unic la nivel european \(EUID\):|Registratorul de registrul comerțului:|"
+                           r"formulată de|D I S P U N E")
+COUNTY_LABEL = "de pe lângă Tribunalul "
+
+# Values are read with anchored patterns right after their label; a label whose value pattern does not
+# match leaves the field open for its next occurrence, as a search over the whole decision would
+LINE_VALUE = re.compile(r"\s*(.*)")
+TOKEN_VALUE = re.compile(r"\s*(\S+)")
+NUMBER_VALUE = re.compile(r"\s*(\d+)")
+COUNTY_VALUE = re.compile(r"(\S+)")
+
+LABEL_FIELDS = {
+    "DOSAR NR.": ("dossier_number", TOKEN_VALUE),
+    "ÎNCHEIERE nr.": ("decision_number", NUMBER_VALUE),
+    "Firma:": ("firm_name", LINE_VALUE),
+    "Sediul:": ("address", LINE_VALUE),
+    COUNTY_LABEL: ("county", COUNTY_VALUE),
+    "Cod unic de înregistrare:": ("registration_code", NUMBER_VALUE),
+    "Număr de ordine în registrul comerțului:": ("registration_order", LINE_VALUE),
+    "Identificator unic la nivel european (EUID):": ("euid", LINE_VALUE),
+    "Registratorul de registrul comerțului:": ("registrator", LINE_VALUE),
+}
+
+REQUEST_PATTERN = re.compile(r"\s+(.*?)\s+(?:în calitate de\s+(.*?)\s+)?privind\s+(.*?)\Z", re.DOTALL)
+REQUEST_FALLBACK_PATTERN = re.compile(
+    r"formulată de\s+(.*?)\s+(?:în calitate de\s+(.*?)\s+)?privind\s+(.*?)(?=\nExaminând)", re.DOTALL)
+DISPOSITION_END = "Registrator de registrul comerțului"
+
+
+def split_decisions(chunks):
+    """(content, pronounced_date) for every "R O M Â N I A … Data: dd.mm.yyyy" block of the concatenated
+    chunks (pages). A decision is yielded as soon as its Data: line arrives; only the unfinished
+    decision is carried over to the next chunk."""
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        position = 0
+        while True:
+            start = buffer.find(DECISION_START, position)
+            if start == -1:
+                # Keep what could be the beginning of an "R O M Â N I A" cut by the page break
+                buffer = buffer[max(position, len(buffer) - len(DECISION_START) + 1):]
+                break
+            date = DECISION_DATE_PATTERN.search(buffer, start + len(DECISION_START))
+            if not date:
+                buffer = buffer[start:]
+                break
+            yield buffer[start + len(DECISION_START):date.start()], date.group(1)
+            position = date.end()
+
+
+def read_request(content, label_start, label_end):
+    """requestor / quality / request_details from "formulată de … privind …" up to the next "\nExaminând".
+
+    The pattern only runs on that stretch of text instead of the whole decision. Whenever the short
+    match could differ from a search over the full decision (no match, an empty requestor, or empty
+    details: the full search's \s+ after "privind" may swallow the "\n" of "\nExaminând" and run on to
+    a later one) the full search is used instead."""
+    window_end = content.find("\nExaminând", label_end)
+    match = REQUEST_PATTERN.match(content, label_end, window_end) if window_end != -1 else None
+    if not match or not match.group(1).strip() or not match.group(3):
+        match = REQUEST_FALLBACK_PATTERN.search(content, label_start)
+    return match
+
+
+def clean(value):
+    return value.strip().replace('\n', ' ') if value is not None else None
+
+
+def read_fields(content):
+    fields = {}
+    request = None
+    disposition_text = None
+    seen = set()
+
+    for label_match in LABEL_PATTERN.finditer(content):
+        label = label_match.group()
+        label_end = label_match.end()
+
+        if label in LABEL_FIELDS:
+            field, value_pattern = LABEL_FIELDS[label]
+            if field not in fields:
+                value = value_pattern.match(content, label_end)
+                if value:
+                    fields[field] = value.group(1)
+        elif label == "formulată de":
+            # "formulată de pe lângă Tribunalul X" shares its "de" with the county label
+            if "county" not in fields and content.startswith(COUNTY_LABEL, label_end - 2):
+                value = COUNTY_VALUE.match(content, label_end - 2 + len(COUNTY_LABEL))
+                if value:
+                    fields["county"] = value.group(1)
+            if label not in seen:
+                seen.add(label)
+                request = read_request(content, label_match.start(), label_end)
+        elif label not in seen:
+            # Only the first "D I S P U N E" matters: later ones cannot reach a closing marker it missed
+            seen.add(label)
+            disposition_end = content.find(DISPOSITION_END, label_end)
+            if disposition_end != -1:
+                disposition_text = content[label_end:disposition_end]
+
+    return fields, request, disposition_text
 
 
-# Step 2: Define patterns for extraction with optional "in calitate de" and including county
 def extract_information_with_county(text):
-    decisions = []
-    # Define the pattern for decisions using the updated regex
-    decision_pattern = re.compile(r"R O M Â N I A(.*?)Data:\s*(\d{2}\.\d{2}\.\d{4})", re.DOTALL)
-    matches = decision_pattern.findall(text)
-
-    for match in matches:
-        decision = {}
-        content, pronounced_date = match
-        # Extract dossier number, decision number, etc.
-        dossier_number = re.search(r"DOSAR NR\.\s*(\S+)", content)
-        decision_number = re.search(r"ÎNCHEIERE nr\.\s*(\d+)", content)
-        firm_name = re.search(r"Firma:\s*(.*?)(?:\n|$)", content)
-        address = re.search(r"Sediul:\s*(.*?)(?:\n|$)", content)
-        county = re.search(r"de pe lângă Tribunalul ([^\s]+)", content)
-        registration_code = re.search(r"Cod unic de înregistrare:\s*(\d+)", content)
-        registration_order = re.search(r"Număr de ordine în registrul comerțului:\s*(.*?)(?:\n|$)", content)
-        euid = re.search(r"Identificator unic la nivel european \(EUID\):\s*(.*?)(?:\n|$)", content)
-        registrator = re.search(r"Registratorul de registrul comerțului:\s*(.*?)(?:\n|$)", content)
-
-        # Extract additional details from the decision text
-        requestor_quality = re.search(
-            r"formulată de\s+(.*?)\s+(?:în calitate de\s+(.*?)\s+)?privind\s+(.*?)(?=\nExaminând)", content, re.DOTALL)
-        disposition_text = re.search(r"D I S P U N E(.*?)Registrator de registrul comerțului", content, re.DOTALL)
-
-        decision['dossier_number'] = dossier_number.group(1) if dossier_number else None
-        decision['decision_number'] = decision_number.group(1) if decision_number else None
-        decision['pronounced_date'] = pronounced_date
-        decision['firm_name'] = firm_name.group(1).strip().replace('\n', ' ') if firm_name else None
-        decision['address'] = address.group(1).strip().replace('\n', ' ') if address else None
-        decision['county'] = get_best_match_county(county.group(1).strip()) if county else None
-        decision['registration_code'] = registration_code.group(1) if registration_code else None
-        decision['registration_order'] = registration_order.group(1).strip().replace('\n',
-                                                                                     ' ') if registration_order else None
-        decision['euid'] = euid.group(1).strip().replace('\n', ' ') if euid else None
-        decision['registrator'] = registrator.group(1).strip().replace('\n', ' ') if registrator else None
-
-        if requestor_quality:
-            decision['requestor'] = requestor_quality.group(1).strip().replace('\n', ' ')
-            decision['quality'] = requestor_quality.group(2).strip().replace('\n', ' ') if requestor_quality.group(
-                2) else None
-            decision['request_details'] = requestor_quality.group(3).strip().replace('\n', ' ')
+    return list(extract_decisions([text]))
+
+
+def extract_decisions(pages, profile=None):
+    """Decisions of a bulletin given as an iterable of page texts, yielded as their Data: line is read"""
+    resolve = resolve_county if profile is None else profile.timed("county", resolve_county)
+
+    for content, pronounced_date in split_decisions(pages):
+        fields, request, disposition_text = read_fields(content)
+        county = fields.get('county')
+        decision = {
+            'dossier_number': fields.get('dossier_number'),
+            'decision_number': fields.get('decision_number'),
+            'pronounced_date': pronounced_date,
+            'firm_name': clean(fields.get('firm_name')),
+            'address': clean(fields.get('address')),
+            'county': resolve(county.strip()) if county else None,
+            'registration_code': fields.get('registration_code'),
+            'registration_order': clean(fields.get('registration_order')),
+            'euid': clean(fields.get('euid')),
+            'registrator': clean(fields.get('registrator')),
+        }
+
+        if request:
+            decision['requestor'] = clean(request.group(1))
+            decision['quality'] = clean(request.group(2)) if request.group(2) else None
+            decision['request_details'] = clean(request.group(3))
         else:
             decision['requestor'] = None
             decision['quality'] = None
             decision['request_details'] = None
 
-        decision['disposition_text'] = disposition_text.group(1).strip().replace('\n',
-                                                                                 '\\n') if disposition_text else None
-
-        decisions.append(decision)
-
-    return decisions
-
-# Global queue to hold extracted data
-data_queue = queue.Queue()
+        decision['disposition_text'] = disposition_text.strip().replace('\n', '\\n') \
+            if disposition_text is not None else None
+
+        yield decision
+
+# "processes" parses PDFs in worker processes (text extraction and the regexes are GIL-bound),
+# "threads" keeps the previous 16-thread pool
+PARSE_ENGINE = "processes"
+PARSE_WORKERS = os.cpu_count() or 4
+PARSE_THREADS = 16
+PARSE_TASKS_PER_WORKER = 4  # Files queued per worker process, so parsed results cannot pile up in memory
+
+# Parsed bulletins waiting for the writer thread; parsers block while it is full
+WRITER_QUEUE_SIZE = 64
+# The writer appends its batched rows once this many are waiting, or this long after its last flush
+WRITER_FLUSH_ROWS = 20000
+WRITER_FLUSH_SECONDS = 5
+WRITER_MAX_OPEN_FILES = 128  # <County>/<Month>.csv handles kept open between flushes
+WRITER_BUFFER_SIZE = 1024 * 1024
+
+# Column order of a decision; worker processes send rows as tuples in this order
+DECISION_FIELDS = [
+    'dossier_number', 'decision_number', 'pronounced_date', 'firm_name', 'address', 'county',
+    'registration_code', 'registration_order', 'euid', 'registrator', 'requestor', 'quality',
+    'request_details', 'disposition_text', 'source_file'
+]
 
-# Flag to signal the saving thread to stop
-stop_flag = threading.Event()
+# County resolver and text cache counters that worker processes report per file
+# (see countyResolver.CountyResolver.stats and textCache.stats)
+COUNTY_STAT_KEYS = ("exact", "mnemonic", "fuzzy", "unresolved", "fuzzy_calls", "fuzzy_cache_hits")
+TEXT_CACHE_STAT_KEYS = ("text_cache_hits", "text_cache_misses")
 
-# Accumulated data for batch saving
-accumulated_data = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+# Page text extracted by pymupdf is kept in <bulletins>/text-cache, keyed by the PDF's SHA-256 and the pymupdf
+# version, so parser changes only re-run the regex layer. Run with --from-cache to re-parse only cached bulletins.
+TEXT_CACHE = True
 
+# "csv" appends to <County>/<Month>.csv; "parquet" writes the typed, partitioned dataset of decisionStore.py
+OUTPUT_FORMAT = "csv"
 
-def process_file(file_path, output_directory):
-    try:
-        filename = os.path.basename(file_path)
-        logging.info(f"Processing file: {filename}")
+# Recorded in the ledger of the output folder; bump it when parsing changes so every bulletin is parsed again
+PARSER_VERSION = "1"
 
-        text = extract_text_from_pdf(file_path)
-        logging.debug(f"Extracted text from {filename}")
+# --rebuild moves the output folder here before parsing every bulletin into an empty one
+REBUILD_SUFFIX = "-before-rebuild"
 
-        decisions = extract_information_with_county(text)
-        logging.debug(f"Extracted {len(decisions)} decisions from {filename}")
+# Download/parse manifest of the bulletins folder, opened by process_all_files_in_directory
+manifest = None
 
-        if decisions:
-            df = pd.DataFrame(decisions)
-            if 'county' in df.columns and df['county'].notna().any():
-                county_month_data = defaultdict(lambda: defaultdict(list))
+# Ledger of the output folder and the size/mtime/hash of the files being parsed (see parseLedger.py)
+ledger = None
+file_states = {}
 
-                for _, row in df.iterrows():
-                    county = row['county']
-                    if pd.notna(county):
-                        month = pd.to_datetime(row['pronounced_date'], format='%d.%m.%Y').strftime('%B')
-                        county_month_data[county][month].append(row.to_dict())
+# DecisionWriter of the output folder, started by process_all_files_in_directory
+writer = None
 
-                # Submit the extracted data to the queue
-                data_queue.put((county_month_data, output_directory))
-                logging.info(f"Data from {filename} added to queue")
+# PipelineProfile of the run when profiling is on (see pipelineProfile.py)
+profiler = None
 
-        return f"Processed file {filename}"
-    except Exception as e:
-        logging.error(f"Error processing file {filename}: {str(e)}")
-        return f"Error processing file {filename}: {str(e)}"
 
+@lru_cache(maxsize=4096)
+def month_of(pronounced_date):
+    """'25.04.2024' -> 'April'; bulletins repeat a handful of dates, so this is cached"""
+    return datetime.strptime(pronounced_date, '%d.%m.%Y').strftime('%B')
 
-def save_data_thread():
-    global accumulated_data
-    last_save_time = time.time()
 
-    while not stop_flag.is_set():
-        try:
-            county_month_data, output_directory = data_queue.get(timeout=1)
-            logging.debug(f"Retrieved data from queue for {output_directory}")
-
-            # Accumulate data
-            for county, month_data in county_month_data.items():
-                for month, decisions in month_data.items():
-                    accumulated_data[output_directory][county][month].extend(decisions)
-            logging.debug(
-                f"Accumulated data: {sum(len(decisions) for county_data in accumulated_data[output_directory].values() for decisions in county_data.values())} decisions")
-
-            # Check if it's time to save
-            current_time = time.time()
-            if current_time - last_save_time >= 5:
-                save_accumulated_data()
-                last_save_time = current_time
-
-            data_queue.task_done()
-        except queue.Empty:
-            # If queue is empty, check if it's time to save
-            current_time = time.time()
-            if current_time - last_save_time >= 5:
-                save_accumulated_data()
-                last_save_time = current_time
-        except Exception as e:
-            logging.error(f"Error in save_data_thread: {str(e)}")
+def group_decisions(decisions):
+    """county -> month -> decision rows (tuples in DECISION_FIELDS order); decisions without a county are dropped.
+    Fields a decision lacks (source_file outside parse_file) are None."""
+    county_month_rows = defaultdict(lambda: defaultdict(list))
+    for decision in decisions:
+        county = decision['county']
+        if county is not None:
+            month = month_of(decision['pronounced_date'])
+            county_month_rows[county][month].append(tuple(decision.get(field) for field in DECISION_FIELDS))
+    return {county: dict(month_rows) for county, month_rows in county_month_rows.items()}
 
-    # Final save after processing all files
-    save_accumulated_data()
 
+def run_stats():
+    return {**resolver.stats(), **textCache.stats()}
 
-def save_accumulated_data():
-    global accumulated_data
-    logging.info("Saving accumulated data")
-    for output_directory, county_data in accumulated_data.items():
-        for county, month_data in county_data.items():
-            county_dir = os.path.join(output_directory, county)
-            os.makedirs(county_dir, exist_ok=True)
 
-            for month, decisions in month_data.items():
-                output_file_path = os.path.join(county_dir, f"{month}.csv")
+def parse_file(file_path, sha256=None, text_cache_dir=None, profile=False):
+    """Extract and group the decisions of one bulletin. Runs in worker processes, so it only returns
+    plain data: (file_path, county_month_rows, decision_count, error, stats, file_profile)
 
-                df = pd.DataFrame(decisions)
-                logging.debug(f"Saving {len(df)} decisions for {county} - {month}")
-
-                with threading.Lock():
-                    if os.path.exists(output_file_path):
-                        # Append to existing file without writing the header
-                        df.to_csv(output_file_path, mode='a', header=False, index=False)
-                    else:
-                        # Create new file with header
-                        df.to_csv(output_file_path, index=False)
-
-    # Clear accumulated data after saving
-    accumulated_data.clear()
-    logging.info("Accumulated data saved and cleared")
+    Decisions are grouped as they are extracted, so only their row tuples are kept. The rows of a bulletin
+    are still returned together: the writer commits them with the bulletin's ledger entry in one flush, so an
+    interrupted run never leaves part of a bulletin behind (see parseLedger.py)."""
+    stats_before = run_stats()
+    file_profile = FileProfile() if profile else None
+    start = time.perf_counter()
+    try:
+        filename = os.path.basename(file_path)
+        logging.info(f"Processing file: {filename}")
 
+        pages = bulletin_pages(file_path, sha256, text_cache_dir, file_profile)
+        if file_profile:
+            file_profile.count("pdf_bytes", os.path.getsize(file_path))
+            pages = file_profile.timed_iter("page_text", pages)
+        source = source_id(file_path)
+        decision_count = 0
+
+        def tagged(decisions):
+            nonlocal decision_count
+            for decision in decisions:
+                decision['source_file'] = source
+                decision_count += 1
+                yield decision
+
+        decisions = extract_decisions(pages, file_profile)
+        if file_profile:
+            decisions = file_profile.timed_iter("extract", decisions)
+        group_start = time.perf_counter()
+        county_month_rows = group_decisions(tagged(decisions))
+        logging.debug(f"Extracted {decision_count} decisions from {filename}")
+        if file_profile:
+            # Extraction and grouping are interleaved: what the decisions took to produce, less page text and
+            # county lookups, is parsing; the rest of the loop is grouping
+            extract = file_profile.stages.pop("extract", 0.0)
+            file_profile.add("parse", extract - file_profile.stages["page_text"] - file_profile.stages["county"])
+            file_profile.add("group", time.perf_counter() - group_start - extract)
+            file_profile.count("decisions", decision_count)
+        result = file_path, county_month_rows, decision_count, None
+    except Exception as e:
+        result = file_path, None, 0, str(e)
+    if file_profile:
+        file_profile.add("total", time.perf_counter() - start)
+        file_profile.count("files")
+    # Counters of this file's county lookups and text cache use, summed by the parent when workers are
+    # separate processes
+    stats = {key: value - stats_before[key] for key, value in run_stats().items()
+             if key in COUNTY_STAT_KEYS + TEXT_CACHE_STAT_KEYS}
+    return result + (stats, file_profile)
+
+
+def handle_parsed_file(result):
+    """Parent side: queue the decisions for saving and record the outcome in the manifest"""
+    file_path, county_month_rows, decision_count, error, _, file_profile = result
+    filename = os.path.basename(file_path)
+    if file_profile:
+        profiler.add_file(file_profile)
+    if error:
+        logging.error(f"Error processing file {filename}: {error}")
+        if manifest:
+            manifest.mark_parse_failed(*bulletin_from_path(file_path), error)
+        return f"Error processing file {filename}: {error}"
+
+    ledger_entry = None
+    if ledger:
+        ledger_entry = dict(file_states.pop(file_path), decision_count=decision_count,
+                            partitions=[[county, month] for county in county_month_rows for month in county_month_rows[county]])
+
+    # Submit the extracted rows to the writer (files without decisions too, for their ledger entry)
+    if county_month_rows or ledger_entry:
+        put_start = time.perf_counter()
+        writer.put(county_month_rows, ledger_entry)
+        if profiler:
+            profiler.add("queue_wait", time.perf_counter() - put_start)
+        logging.info(f"Data from {filename} added to queue")
+
+    if manifest:
+        manifest.mark_parsed(*bulletin_from_path(file_path), decision_count)
+    return f"Processed file {filename}"
+
+
+def process_file(file_path, text_cache_dir=None):
+    sha256 = file_states.get(file_path, {}).get("sha256")
+    return handle_parsed_file(parse_file(file_path, sha256, text_cache_dir, profiler is not None))
+
+
+def bounded_map(executor, function, *iterables, window):
+    """executor.map that keeps at most window tasks submitted, so workers wait when results are not consumed"""
+    pending = deque()
+    for args in zip(*iterables):
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(function, *args))
+    while pending:
+        yield pending.popleft().result()
+
+
+def read_csv_as_text(path):
+    """Every field as the exact text in the file, so rewriting a CSV does not alter the rows it keeps"""
+    return pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8')
+
+
+def rewrite_csv(path, df):
+    temp_path = path + ".tmp"
+    df.to_csv(temp_path, index=False)
+    os.replace(temp_path, path)
+
+
+def ensure_csv_columns(path):
+    """CSVs written before a column was added get it (empty for their rows) so appended rows line up"""
+    with open(path, encoding='utf-8') as f:
+        header = f.readline().rstrip('\r\n').split(',')
+    if header != DECISION_FIELDS:
+        df = read_csv_as_text(path)
+        for field in DECISION_FIELDS:
+            if field not in df.columns:
+                df[field] = ''
+        rewrite_csv(path, df[DECISION_FIELDS])
+
+
+def remove_csv_rows(output_directory, county, month, sources):
+    path = os.path.join(output_directory, county, f"{month}.csv")
+    if not os.path.exists(path):
+        return 0
+    df = read_csv_as_text(path)
+    if 'source_file' not in df.columns:
+        return 0
+    keep = ~df['source_file'].isin(sources)
+    if not keep.all():
+        rewrite_csv(path, df[keep])
+    return int((~keep).sum())
+
+
+def remove_rows(output_directory, county, month, sources):
+    if OUTPUT_FORMAT == "parquet":
+        from decisionStore import remove_sources
+        return remove_sources(output_directory, county, month, sources)
+    return remove_csv_rows(output_directory, county, month, sources)
+
+
+class DecisionWriter:
+    """Saves parsed bulletins on its own thread. Rows are batched until WRITER_FLUSH_ROWS or WRITER_FLUSH_SECONDS,
+    then appended through <County>/<Month>.csv handles that stay open between flushes (Parquet: one part file
+    per partition and flush), between ledger.begin and ledger.commit of the files they came from."""
+
+    def __init__(self, output_directory, ledger=None, output_format=None, profile=None):
+        self.output_directory = output_directory
+        self.ledger = ledger
+        self.profile = profile
+        self.output_format = output_format or OUTPUT_FORMAT
+        self.queue = queue.Queue(maxsize=WRITER_QUEUE_SIZE)
+        self.pending_rows = defaultdict(list)  # (county, month) -> rows
+        self.pending_entries = []
+        self.pending_count = 0
+        self.handles = OrderedDict()  # (county, month) -> (file, csv writer), least recently used first
+        self.last_flush = time.monotonic()
+        self.thread = threading.Thread(target=self.run, name="decision-writer")
+        self.thread.start()
+
+    def put(self, county_month_rows, ledger_entry=None):
+        """Blocks while the queue is full, so parsing cannot run ahead of the disk"""
+        self.queue.put((county_month_rows, ledger_entry))
+
+    def close(self):
+        """Write everything queued so far and close the files"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0, WRITER_FLUSH_SECONDS - (time.monotonic() - self.last_flush)))
+            except queue.Empty:
+                self.flush()
+                continue
+            if item is None:
+                break
+
+            county_month_rows, ledger_entry = item
+            for county, month_rows in county_month_rows.items():
+                for month, rows in month_rows.items():
+                    self.pending_rows[(county, month)].extend(rows)
+                    self.pending_count += len(rows)
+            if ledger_entry:
+                self.pending_entries.append(ledger_entry)
+
+            if self.pending_count >= WRITER_FLUSH_ROWS or time.monotonic() - self.last_flush >= WRITER_FLUSH_SECONDS:
+                self.flush()
+
+        self.flush()
+        for file, _ in self.handles.values():
+            file.close()
+        self.handles.clear()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.pending_rows and not self.pending_entries:
+            return
+        partition_rows, entries = self.pending_rows, self.pending_entries
+        self.pending_rows, self.pending_entries, self.pending_count = defaultdict(list), [], 0
 
-def process_all_files_in_directory(input_directory, output_directory):
+        try:
+            start = time.perf_counter()
+            # Entries are pending while their rows are written: after a crash those files count as changed
+            if self.ledger and entries:
+                self.ledger.begin(entries, PARSER_VERSION)
+            write_start = time.perf_counter()
+
+            if self.output_format == "parquet":
+                from decisionStore import append_decisions
+                for (county, month), rows in partition_rows.items():
+                    append_decisions(self.output_directory, county, month,
+                                     [dict(zip(DECISION_FIELDS, row)) for row in rows])
+            else:
+                for (county, month), rows in partition_rows.items():
+                    self.csv_writer(county, month).writerows(rows)
+                for file, _ in self.handles.values():
+                    file.flush()
+
+            write_end = time.perf_counter()
+            if self.ledger and entries:
+                self.ledger.commit(entries)
+            if self.profile:
+                self.profile.add("write", write_end - write_start)
+                self.profile.add("ledger", write_start - start + time.perf_counter() - write_end)
+            logging.debug(f"Saved {sum(len(rows) for rows in partition_rows.values())} decisions "
+                          f"from {len(entries)} files in {len(partition_rows)} partitions")
+        except Exception as e:
+            # Their ledger entries stay pending, so these files are parsed again on the next run
+            logging.error(f"Error saving decisions of {len(entries)} files: {str(e)}")
+
+    def csv_writer(self, county, month):
+        key = (county, month)
+        if key in self.handles:
+            self.handles.move_to_end(key)
+            return self.handles[key][1]
+        if len(self.handles) >= WRITER_MAX_OPEN_FILES:
+            _, (file, _) = self.handles.popitem(last=False)
+            file.close()
+
+        county_dir = os.path.join(self.output_directory, county)
+        os.makedirs(county_dir, exist_ok=True)
+        path = os.path.join(county_dir, f"{month}.csv")
+        has_header = os.path.exists(path) and os.path.getsize(path) > 0
+        if has_header:
+            ensure_csv_columns(path)
+        # Same dialect as DataFrame.to_csv: minimal quoting, \n line endings, None as an empty field
+        file = open(path, 'a', newline='', encoding='utf-8', buffering=WRITER_BUFFER_SIZE)
+        csv_writer = csv.writer(file, lineterminator='\n')
+        if not has_header:
+            csv_writer.writerow(DECISION_FIELDS)
+        self.handles[key] = (file, csv_writer)
+        return csv_writer
+
+
+def list_bulletin_files(input_directory):
+    """Downloaded PDFs of the year folder, according to the manifest"""
+    global manifest
+    year_directory = os.path.normpath(input_directory)
+    year = int(os.path.basename(year_directory))
+    manifest = BulletinManifest(manifest_path(os.path.dirname(year_directory)))
+    # PDFs on disk without a manifest row (older downloads, files added by hand) are registered on every run
+    registered = manifest.import_directory(year, year_directory)
+    if registered:
+        logging.info(f"Registered {registered} bulletins of {year} missing from the manifest")
+
+    return [os.path.join(input_directory, f"{number}.pdf") for number in sorted(manifest.downloaded_numbers(year))
+            if os.path.exists(os.path.join(input_directory, f"{number}.pdf"))]
+
+
+def select_changed_files(file_paths, output_directory, cached_only_in=None):
+    """Skip files the output folder already holds current rows for and remove the rows of changed ones,
+    so their new rows replace them instead of being appended twice. With cached_only_in (a text cache folder),
+    new or changed files whose text is not cached there are left as they are: their old rows stay until a
+    run that can parse them."""
+    global ledger
+    ledger = ParseLedger(ledger_path(output_directory))
+
+    file_states.clear()
+    selected = []
+    changed = []
+    not_cached = 0
+    for file_path in file_paths:
+        status, state = ledger.check(file_path, PARSER_VERSION)
+        if status == "current":
+            continue
+        if cached_only_in and not textCache.is_cached(cached_only_in, state["sha256"]):
+            not_cached += 1
+            continue
+        if status == "changed":
+            changed.append(state["source"])
+        file_states[file_path] = state
+        selected.append(file_path)
+
+    removed = 0
+    for (county, month), sources in ledger.partitions_of(changed).items():
+        removed += remove_rows(output_directory, county, month, sources)
+    ledger.forget(changed)
+
+    unchanged = len(file_paths) - len(selected) - not_cached
+    print(f"{len(selected)} of {len(file_paths)} bulletins to parse ({len(changed)} changed, "
+          f"{removed} old rows removed); {unchanged} unchanged"
+          + (f", {not_cached} new or changed but not in the text cache (left for a full run)" if cached_only_in else ""))
+    return selected
+
+
+def has_unledgered_rows(output_directory):
+    """Rows written before the folder had a ledger have no source_file, so they can never be replaced"""
+    return (not os.path.exists(ledger_path(output_directory))
+            and any(not name.startswith(LEDGER_FILENAME) for name in os.listdir(output_directory)))
+
+
+def move_aside(output_directory):
+    """Rename the output folder (rows and ledger) to <folder>-before-rebuild[-<timestamp>] and recreate it empty"""
+    target = os.path.normpath(output_directory) + REBUILD_SUFFIX
+    if os.path.exists(target):
+        target += datetime.now().strftime("-%Y%m%d-%H%M%S")
+    os.replace(os.path.normpath(output_directory), target)
+    os.makedirs(output_directory)
+    print(f"Moved the previous output to {target}; every bulletin is parsed again")
+
+
+def text_cache_directory(input_directory):
+    return os.path.join(os.path.dirname(os.path.normpath(input_directory)), textCache.TEXT_CACHE_FOLDER)
+
+
+def process_all_files_in_directory(input_directory, output_directory, from_cache=False, profile=False,
+                                   profile_json=None, rebuild=False, keep_existing_rows=False):
+    """Parse the new or changed bulletins of a year folder; from_cache re-parses only bulletins whose text is
+    already cached, without opening any PDF. profile prints per-stage timings at the end (and writes them to
+    profile_json if given).
+
+    An output folder with rows but no ledger (written before the ledger existed) is refused, since its rows
+    would be appended again: rebuild moves it aside and parses every bulletin, keep_existing_rows appends anyway."""
+    global profiler
+    profiler = PipelineProfile() if profile or profile_json else None
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
-
-    file_paths = [os.path.join(input_directory, filename)
-                  for filename in os.listdir(input_directory)
-                  if filename.endswith(".pdf")]
+    elif rebuild:
+        move_aside(output_directory)
+    elif has_unledgered_rows(output_directory) and not keep_existing_rows:
+        raise ValueError(f"{output_directory} has rows written before it had a ledger; they have no source_file, "
+                         f"so parsing would append every bulletin's rows to them again. Run with --rebuild to move "
+                         f"them aside and parse every bulletin, or --keep-existing-rows to append anyway.")
+
+    text_cache_dir = text_cache_directory(input_directory) if TEXT_CACHE or from_cache else None
+    file_paths = select_changed_files(list_bulletin_files(input_directory), output_directory,
+                                      cached_only_in=text_cache_dir if from_cache else None)
+    shas = [file_states[file_path]["sha256"] for file_path in file_paths]
 
     total_files = len(file_paths)
     logging.info(f"Found {total_files} PDF files to process")
 
-    # Start the saving thread
-    save_thread = threading.Thread(target=save_data_thread)
-    save_thread.start()
+    global writer
+    writer = DecisionWriter(output_directory, ledger, profile=profiler)
 
-    with ThreadPoolExecutor(max_workers=16) as executor:
-        futures = [executor.submit(process_file, file_path, output_directory)
-                   for file_path in file_paths]
+    # Worker processes have their own resolvers and cache counters, so their per-file counters are summed here;
+    # threads share this process's
+    stats = defaultdict(int) if PARSE_ENGINE == "processes" else None
 
+    try:
         with tqdm(total=total_files, desc="Processing files", unit="file") as progress_bar:
-            for future in as_completed(futures):
-                result = future.result()
-                progress_bar.update(1)
-                progress_bar.set_postfix_str(result)
-
-    # Signal the saving thread to stop
-    logging.info("All files processed, signaling save thread to stop")
-    stop_flag.set()
-
-    # Wait for the queue to be empty and the saving thread to finish
-    data_queue.join()
-    save_thread.join()
-
-    # Perform a final save to ensure all data is persisted
-    save_accumulated_data()
+            if PARSE_ENGINE == "processes":
+                logging.info(f"Parsing with {PARSE_WORKERS} worker processes")
+                with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as executor:
+                    for parsed in bounded_map(executor, parse_file, file_paths, shas, repeat(text_cache_dir),
+                                              repeat(profiler is not None),
+                                              window=PARSE_WORKERS * PARSE_TASKS_PER_WORKER):
+                        for key, value in parsed[4].items():
+                            stats[key] += value
+                        result = handle_parsed_file(parsed)
+                        progress_bar.update(1)
+                        progress_bar.set_postfix_str(result)
+            else:
+                with ThreadPoolExecutor(max_workers=PARSE_THREADS) as executor:
+                    futures = [executor.submit(process_file, file_path, text_cache_dir)
+                               for file_path in file_paths]
+                    for future in as_completed(futures):
+                        result = future.result()
+                        progress_bar.update(1)
+                        progress_bar.set_postfix_str(result)
+    finally:
+        # The writer saves everything still queued before it stops
+        logging.info("All files processed, waiting for the writer")
+        writer.close()
+
+    if OUTPUT_FORMAT == "parquet":
+        from decisionStore import compact_dataset
+        compact_dataset(output_directory)
+
+    stats = stats if stats is not None else run_stats()
+    print(format_stats(stats))
+    if text_cache_dir:
+        print(f"Text cache: {stats['text_cache_hits']} bulletins read from the cache, "
+              f"{stats['text_cache_misses']} extracted with pymupdf")
+        textCache.evict(text_cache_dir)
+    failures = manifest.parse_failures(int(os.path.basename(os.path.normpath(input_directory))))
+    if failures:
+        print(f"{len(failures)} bulletins failed to parse (see parse_error in the manifest): "
+              f"{', '.join(map(str, failures))}")
+    if profiler:
+        print(profiler.report())
+        if profile_json:
+            profiler.dump(profile_json)
+            print(f"Profile written to {profile_json}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Extract the decisions of the downloaded bulletins")
+    parser.add_argument("--from-cache", action="store_true",
+                        help="Re-parse only bulletins whose text is in the text cache, without opening PDFs")
+    parser.add_argument("--profile", action="store_true", help="Print per-stage timings at the end of the run")
+    parser.add_argument("--profile-json", help="Also write the timings to this JSON file")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Move the output folder aside and parse every bulletin into an empty one")
+    parser.add_argument("--keep-existing-rows", action="store_true",
+                        help="Append to an output folder written before it had a ledger (its rows are not replaced)")
+    args = parser.parse_args()
+
     year = "2024"  # You can modify this to take user input or as a command-line argument
     input_directory = f'bulletins/{year}/'
-    output_directory = 'bulletins-analysis/counties-new/'
+    output_directory = 'bulletins-analysis/counties-new/' if OUTPUT_FORMAT == "csv" else 'bulletins-analysis/counties-parquet/'
 
     # Process files
-    process_all_files_in_directory(input_directory, output_directory)
+    process_all_files_in_directory(input_directory, output_directory, from_cache=args.from_cache,
+                                   profile=args.profile, profile_json=args.profile_json, rebuild=args.rebuild,
+                                   keep_existing_rows=args.keep_existing_rows)
 
     logging.info(f"Processing complete for year {year}")
 
@@ -0,0 +1,291 @@
+import asyncio
+import json
+import sys
+import shutil
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+
+import aiohttp
+
+import scraperCommon as common
+from counties import counties
+from rateController import AsyncRateLimiter
+
+
+def new_stats():
+    return {"requests": 0, "errors": 0, "records": 0, "counties_done": 0, "start": time.perf_counter()}
+
+
+async def post(session, limiter, url, payload, stats):
+    """POST inside a rate limiter slot; the response status (or the failure) is fed back to the controller.
+
+    The slot is held until the body is read, so the controller sees the request in flight for as long as
+    the server is working on it."""
+    await limiter.acquire()
+    stats["requests"] += 1
+    started = time.perf_counter()
+    try:
+        async with session.post(url, json=payload) as response:
+            response_text = await response.text()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        limiter.release(failed=True)
+        raise
+    except BaseException:
+        limiter.release()
+        raise
+    limiter.release(time.perf_counter() - started, response.status, response.headers.get('Retry-After'))
+    response.raise_for_status()
+    return response_text
+
+
+async def make_request(session, limiter, url, payload, stats):
+    for attempt in range(common.MAX_RETRIES):
+        try:
+            response_text = await post(session, limiter, url, payload, stats)
+
+            # Same behaviour as main.make_request: undecodable bodies are logged and not retried
+            try:
+                return json.loads(response_text)
+            except json.JSONDecodeError:
+                common.log_error({
+                    "timestamp": datetime.now().isoformat(),
+                    "url": url,
+                    "payload": payload,
+                    "error_type": "JSONDecodeError",
+                    "error_message": "Failed to decode JSON response",
+                    "response_content": response_text,
+                    "attempt": attempt + 1
+                })
+                return None
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            stats["errors"] += 1
+            common.log_error({
+                "timestamp": datetime.now().isoformat(),
+                "url": url,
+                "payload": payload,
+                "error_type": type(e).__name__,
+                "error_message": str(e),
+                "attempt": attempt + 1
+            })
+            if attempt == common.MAX_RETRIES - 1:
+                return None
+            await asyncio.sleep(limiter.retry_delay())
+    return None
+
+
+def new_stage_stats():
+    return {"count": 0, "latency": 0.0, "max_latency": 0.0, "queue_wait": 0.0}
+
+
+def record_stage(stage_stats, queue_wait, latency):
+    stage_stats["count"] += 1
+    stage_stats["latency"] += latency
+    stage_stats["max_latency"] = max(stage_stats["max_latency"], latency)
+    stage_stats["queue_wait"] += queue_wait
+
+
+def format_stage(name, stage_stats):
+    count = stage_stats["count"] or 1
+    return (f"{name}: {stage_stats['count']} calls, avg {stage_stats['latency'] / count * 1000:.0f}ms, "
+            f"max {stage_stats['max_latency'] * 1000:.0f}ms, avg queue wait {stage_stats['queue_wait'] / count * 1000:.0f}ms")
+
+
+class FetchPipeline:
+    """Discovery workers (publicitySituations) feed detail workers (filter-article) through a bounded queue.
+
+    discover() returns a future resolving to (response, detail futures), so callers can commit results in
+    application-number order while discovery keeps running ahead of the detail fetches."""
+
+    def __init__(self, session, limiter, stats):
+        self.session = session
+        self.limiter = limiter
+        self.stats = stats
+        self.discovery_queue = asyncio.Queue()
+        self.detail_queue = asyncio.Queue(maxsize=common.DETAIL_QUEUE_SIZE)
+        self.workers = []
+        stats["stages"] = {"discovery": new_stage_stats(), "detail": new_stage_stats()}
+
+    def start(self):
+        self.workers = [asyncio.create_task(self.discovery_worker()) for _ in range(common.DISCOVERY_WORKERS)]
+        self.workers += [asyncio.create_task(self.detail_worker()) for _ in range(common.DETAIL_WORKERS)]
+
+    async def stop(self):
+        """Cancel the workers until every one of them has finished (a worker can absorb a cancellation)"""
+        running = list(self.workers)
+        while running:
+            for worker in running:
+                worker.cancel()
+            await asyncio.wait(running, timeout=1)
+            running = [worker for worker in running if not worker.done()]
+        await asyncio.gather(*self.workers, return_exceptions=True)
+
+    def discover(self, county, application_number):
+        future = asyncio.get_running_loop().create_future()
+        self.discovery_queue.put_nowait((county, application_number, future, time.perf_counter()))
+        return future
+
+    def queue_depths(self):
+        return self.discovery_queue.qsize(), self.detail_queue.qsize()
+
+    async def discovery_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            county, application_number, future, queued_at = await self.discovery_queue.get()
+            if future.cancelled():
+                continue
+            started = time.perf_counter()
+            try:
+                url, payload = common.first_request(county, application_number)
+                response = await make_request(self.session, self.limiter, url, payload, self.stats)
+                record_stage(self.stats["stages"]["discovery"], started - queued_at, time.perf_counter() - started)
+
+                details = []
+                for record in response or []:
+                    detail = loop.create_future()
+                    # Blocks when the detail stage is behind, which is the backpressure on discovery
+                    await self.detail_queue.put((county, application_number, record["id"], detail, time.perf_counter()))
+                    details.append(detail)
+                if not future.cancelled():
+                    future.set_result((response, details))
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def detail_worker(self):
+        while True:
+            county, application_number, publicity_id, future, queued_at = await self.detail_queue.get()
+            if future.cancelled():
+                continue
+            started = time.perf_counter()
+            try:
+                url, payload = common.second_request(publicity_id, application_number, county)
+                response2 = await make_request(self.session, self.limiter, url, payload, self.stats)
+                record_stage(self.stats["stages"]["detail"], started - queued_at, time.perf_counter() - started)
+                if not future.cancelled():
+                    future.set_result(response2)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+
+async def process_county_async(county, pipeline, stats):
+    all_results = []
+    empty_count = 0
+    last_processed, successful_requests = await asyncio.to_thread(common.get_last_processed_number, county)
+    start_number = last_processed + 1
+    start_time = datetime.now()
+
+    # Application numbers are discovered COUNTY_WINDOW at a time but committed strictly in order,
+    # so the saved file and the resume point are the same as with the sequential engine.
+    numbers = iter(range(start_number, common.MAX_APPLICATION_NUMBER))
+    pending = deque()
+
+    def fill_window():
+        while len(pending) < common.COUNTY_WINDOW:
+            application_number = next(numbers, None)
+            if application_number is None:
+                return
+            pending.append((application_number, pipeline.discover(county, application_number)))
+
+    try:
+        fill_window()
+        while pending:
+            application_number, future = pending.popleft()
+            response, detail_futures = await future
+            details = await asyncio.gather(*detail_futures)
+            fill_window()
+
+            if response:
+                for response2 in details:
+                    if response2:
+                        all_results.extend(response2)
+                        empty_count = 0
+                        successful_requests += 1
+                        stats["records"] += len(response2)
+
+                        if successful_requests % common.SAVE_FREQUENCY == 0:
+                            await asyncio.to_thread(common.save_results, county, all_results)
+                            all_results = []
+
+                if len(response) == 0:
+                    empty_count += 1
+                else:
+                    empty_count = 0
+            else:
+                empty_count += 1
+
+            if empty_count >= common.MAX_EMPTY_COUNT:
+                print(
+                    f"\nNo data found for {empty_count} consecutive application numbers. Stopping search for county {county['name']}.")
+                break
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+    if all_results:
+        await asyncio.to_thread(common.save_results, county, all_results)
+
+    total_time = (datetime.now() - start_time).total_seconds() / 60
+    final_rate = successful_requests / total_time if total_time > 0 else 0
+    return f"\nCompleted {county['name']}: Total successful: {successful_requests}, Rate: {final_rate:.2f}/min"
+
+
+async def run_county(county, pipeline, stats):
+    try:
+        print(await process_county_async(county, pipeline, stats))
+    except Exception as exc:
+        common.log_error({
+            "timestamp": datetime.now().isoformat(),
+            "county": county['name'],
+            "error_type": type(exc).__name__,
+            "error_message": str(exc),
+            "traceback": traceback.format_exc()
+        })
+        print(f"\nCounty {county['name']} generated an exception. See errors.txt for details.")
+    finally:
+        stats["counties_done"] += 1
+
+
+async def report_status(stats, total_counties, pipeline):
+    while True:
+        await asyncio.sleep(common.STATUS_UPDATE_INTERVAL)
+        elapsed = time.perf_counter() - stats["start"]
+        rate = stats["requests"] / elapsed if elapsed > 0 else 0
+        discovery_depth, detail_depth = pipeline.queue_depths()
+        limit = pipeline.limiter.snapshot()
+        status_line = (f"Counties: {stats['counties_done']}/{total_counties}, Requests: {stats['requests']}, "
+                       f"Records: {stats['records']}, Errors: {stats['errors']}, Rate: {rate:.2f} req/s, "
+                       f"Limit: {limit['limit']} ({limit['latency_ms']:.0f}ms), "
+                       f"Queues: discovery {discovery_depth}, detail {detail_depth}/{common.DETAIL_QUEUE_SIZE}")
+        sys.stdout.write('\r' + status_line + ' ' * (shutil.get_terminal_size().columns - len(status_line)))
+        sys.stdout.flush()
+
+
+async def scrape_counties(headers, county_list, stats):
+    limiter = AsyncRateLimiter(common.RATE_INITIAL_LIMIT, common.MAX_IN_FLIGHT)
+    connector = aiohttp.TCPConnector(limit=common.MAX_IN_FLIGHT, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=30)
+
+    async with aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout) as session:
+        pipeline = FetchPipeline(session, limiter, stats)
+        pipeline.start()
+        status_task = asyncio.create_task(report_status(stats, len(county_list), pipeline))
+        try:
+            await asyncio.gather(*(run_county(county, pipeline, stats) for county in county_list))
+        finally:
+            status_task.cancel()
+            await pipeline.stop()
+
+    print("\n" + format_stage("Discovery stage", stats["stages"]["discovery"]))
+    print(format_stage("Detail stage", stats["stages"]["detail"]))
+
+
+def run_async(headers, county_list=counties):
+    print(f"Using {common.DISCOVERY_WORKERS} discovery + {common.DETAIL_WORKERS} detail workers "
+          f"(adaptive limit, at most {common.MAX_IN_FLIGHT} requests in flight) shared by {len(county_list)} counties")
+    stats = new_stats()
+    asyncio.run(scrape_counties(headers, county_list, stats))
+    return stats
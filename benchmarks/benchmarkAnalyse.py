@@ -0,0 +1,77 @@
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import analyseBulletins
+from syntheticBulletins import write_bulletin_folder
+
+
+def parse_once(engine, input_directory, from_cache=False):
+    output_directory = tempfile.mkdtemp(prefix=f"bench-analyse-{engine}-")
+    analyseBulletins.PARSE_ENGINE = "processes" if engine == "from-cache" else engine
+
+    start = time.perf_counter()
+    analyseBulletins.process_all_files_in_directory(input_directory, output_directory, from_cache=from_cache)
+    elapsed = time.perf_counter() - start
+
+    shutil.rmtree(output_directory, ignore_errors=True)
+    return elapsed
+
+
+def run_engine(engine, input_directory, text_cache):
+    """engine: "threads", "processes" or "from-cache" (processes re-parsing the text cache, which an untimed
+    run fills first). threads and processes only use the cache with text_cache, so they pay for extraction."""
+    if engine != "from-cache":
+        analyseBulletins.TEXT_CACHE = text_cache
+        return parse_once(engine, input_directory)
+
+    analyseBulletins.TEXT_CACHE = True
+    parse_once(engine, input_directory)
+    return parse_once(engine, input_directory, from_cache=True)
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Files/sec of analyseBulletins with thread and process workers")
+    parser.add_argument("--files", type=int, default=64, help="Synthetic bulletins to generate")
+    parser.add_argument("--decisions", type=int, default=200, help="Decisions per bulletin")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="PARSE_WORKERS for the process engine")
+    parser.add_argument("--input", help="Existing bulletins/<year>/ folder instead of synthetic files")
+    parser.add_argument("--engines", default="threads,processes",
+                        help="Comma-separated; add from-cache to time a re-parse from the text cache")
+    parser.add_argument("--text-cache", action="store_true",
+                        help="Use the text cache in every run (later runs then skip pymupdf)")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    analyseBulletins.PARSE_WORKERS = args.workers
+
+    workspace = None
+    input_directory = args.input
+    if not input_directory:
+        workspace = tempfile.mkdtemp(prefix="bench-bulletins-")
+        input_directory = os.path.join(workspace, "2024")
+        print(f"Generating {args.files} bulletins with {args.decisions} decisions each...")
+        write_bulletin_folder(input_directory, args.files, args.decisions)
+    file_count = len([name for name in os.listdir(input_directory) if name.endswith(".pdf")])
+
+    results = {}
+    for engine in args.engines.split(","):
+        elapsed = run_engine(engine, input_directory, args.text_cache)
+        results[engine] = file_count / elapsed
+        print(f"\n{engine}: {file_count} files in {elapsed:.2f}s -> {results[engine]:.2f} files/s")
+
+    if workspace:
+        shutil.rmtree(workspace, ignore_errors=True)
+    if "threads" in results and "processes" in results:
+        print(f"\nSpeedup (processes vs threads, {args.workers} workers): "
+              f"{results['processes'] / results['threads']:.2f}x")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,144 @@
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import analyseBulletins
+from syntheticBulletins import build_bulletin_text
+
+
+def legacy_extract_information_with_county(text):
+    """The per-field regex parser that extract_information_with_county replaced (the baseline)"""
+    decisions = []
+    # Define the pattern for decisions using the updated regex
+    decision_pattern = re.compile(r"R O M Â N I A(.*?)Data:\s*(\d{2}\.\d{2}\.\d{4})", re.DOTALL)
+    matches = decision_pattern.findall(text)
+
+    for match in matches:
+        decision = {}
+        content, pronounced_date = match
+        # Extract dossier number, decision number, etc.
+        dossier_number = re.search(r"DOSAR NR\.\s*(\S+)", content)
+        decision_number = re.search(r"ÎNCHEIERE nr\.\s*(\d+)", content)
+        firm_name = re.search(r"Firma:\s*(.*?)(?:\n|$)", content)
+        address = re.search(r"Sediul:\s*(.*?)(?:\n|$)", content)
+        county = re.search(r"de pe lângă Tribunalul ([^\s]+)", content)
+        registration_code = re.search(r"Cod unic de înregistrare:\s*(\d+)", content)
+        registration_order = re.search(r"Număr de ordine în registrul comerțului:\s*(.*?)(?:\n|$)", content)
+        euid = re.search(r"Identificator unic la nivel european \(EUID\):\s*(.*?)(?:\n|$)", content)
+        registrator = re.search(r"Registratorul de registrul comerțului:\s*(.*?)(?:\n|$)", content)
+
+        # Extract additional details from the decision text
+        requestor_quality = re.search(
+            r"formulată de\s+(.*?)\s+(?:în calitate de\s+(.*?)\s+)?privind\s+(.*?)(?=\nExaminând)", content, re.DOTALL)
+        disposition_text = re.search(r"D I S P U N E(.*?)Registrator de registrul comerțului", content, re.DOTALL)
+
+        decision['dossier_number'] = dossier_number.group(1) if dossier_number else None
+        decision['decision_number'] = decision_number.group(1) if decision_number else None
+        decision['pronounced_date'] = pronounced_date
+        decision['firm_name'] = firm_name.group(1).strip().replace('\n', ' ') if firm_name else None
+        decision['address'] = address.group(1).strip().replace('\n', ' ') if address else None
+        decision['county'] = analyseBulletins.resolve_county(county.group(1).strip()) if county else None
+        decision['registration_code'] = registration_code.group(1) if registration_code else None
+        decision['registration_order'] = registration_order.group(1).strip().replace('\n',
+                                                                                     ' ') if registration_order else None
+        decision['euid'] = euid.group(1).strip().replace('\n', ' ') if euid else None
+        decision['registrator'] = registrator.group(1).strip().replace('\n', ' ') if registrator else None
+
+        if requestor_quality:
+            decision['requestor'] = requestor_quality.group(1).strip().replace('\n', ' ')
+            decision['quality'] = requestor_quality.group(2).strip().replace('\n', ' ') if requestor_quality.group(
+                2) else None
+            decision['request_details'] = requestor_quality.group(3).strip().replace('\n', ' ')
+        else:
+            decision['requestor'] = None
+            decision['quality'] = None
+            decision['request_details'] = None
+
+        decision['disposition_text'] = disposition_text.group(1).strip().replace('\n',
+                                                                                 '\\n') if disposition_text else None
+
+        decisions.append(decision)
+
+    return decisions
+
+
+# Edge cases the single-pass parser must treat exactly like the per-field searches
+EDGE_CASES = [
+    "R O M Â N I A\nDOSAR NR.\n  77/2024\nFirma:\n\n  SPATII SRL  \nSediul:   \nData: 01.02.2024",
+    "R O M Â N I A\nÎNCHEIERE nr. x\nÎNCHEIERE nr.  42\nCod unic de înregistrare: RO\nCod unic de înregistrare:\n123\n"
+    "Data: 02.02.2024",
+    "R O M Â N I A\nde pe lângă Tribunalul \nde pe lângă Tribunalul Cluj\nformulată de  privind ceva\nExaminând\n"
+    "Data: 03.02.2024",
+    "R O M Â N I A\nformulată de X în calitate de Y\nExaminând\nprivind Z\nExaminând\nData: 04.02.2024",
+    "R O M Â N I A\nformulată deX privind nimic\nformulată de A privind B\nExaminând\nData: 05.02.2024",
+    "R O M Â N I A\nformulată de pe lângă Tribunalul Iași privind x\nExaminând\nData: 06.02.2024",
+    "R O M Â N I A\nformulată de A privind B\nExaminând\nformulată de pe lângă Tribunalul Dolj\nData: 10.02.2024",
+    "R O M Â N I A\nformulată de A privind\t\nExaminând\nprivind x\nExaminând\nData: 11.02.2024",
+    "R O M Â N I A\nformulată de A privind  \nExaminând\nData: 12.02.2024",
+    "R O M Â N I A\nD I S P U N E\nfără sfârșit\nD I S P U N E\nData: 07.02.2024",
+    "R O M Â N I A\nD I S P U N ERegistrator de registrul comerțului\nFirma: A\nFirma: B\nData: 08.02.2024",
+    "R O M Â N I A\nfirma fără etichete\nData: 09.02.2024",
+]
+
+
+def load_corpus(args):
+    if args.input:
+        texts = []
+        for filename in sorted(os.listdir(args.input)):
+            if filename.endswith(".pdf"):
+                texts.append(analyseBulletins.extract_text_from_pdf(os.path.join(args.input, filename)) or "")
+        return texts
+    return [build_bulletin_text(args.decisions, seed) for seed in range(args.bulletins)] + ["\n".join(EDGE_CASES)]
+
+
+def time_parser(parser, texts, repeat):
+    best = None
+    decision_count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decision_count = sum(len(parser(text)) for text in texts)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return decision_count / best
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Decisions/sec and output equality of the bulletin parsers")
+    parser.add_argument("--bulletins", type=int, default=20, help="Synthetic bulletins")
+    parser.add_argument("--decisions", type=int, default=200, help="Decisions per synthetic bulletin")
+    parser.add_argument("--input", help="bulletins/<year>/ folder: parse the text of real PDFs instead")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_corpus(args)
+    mismatches = 0
+    decision_total = 0
+    for text in texts:
+        expected = legacy_extract_information_with_county(text)
+        actual = analyseBulletins.extract_information_with_county(text)
+        decision_total += len(expected)
+        if expected != actual:
+            mismatches += 1
+            for old, new in zip(expected, actual):
+                if old != new:
+                    print({key: (old[key], new.get(key)) for key in old if old[key] != new.get(key)})
+                    break
+    print(f"Compared {decision_total} decisions from {len(texts)} texts: {mismatches} text(s) with different output")
+
+    # The fuzzy county match is shared by both parsers; timing without it shows the extraction alone
+    resolve_county = analyseBulletins.resolve_county
+    for label, county_matcher in (("fields only", lambda county: county), ("with county match", resolve_county)):
+        analyseBulletins.resolve_county = county_matcher
+        before = time_parser(legacy_extract_information_with_county, texts, args.repeat)
+        after = time_parser(analyseBulletins.extract_information_with_county, texts, args.repeat)
+        print(f"{label}: per-field regexes {before:.0f} decisions/s, single pass {after:.0f} decisions/s "
+              f"({after / before:.2f}x)")
+    analyseBulletins.resolve_county = resolve_county
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import analyseBulletins
+from syntheticBulletins import build_bulletin_text
+
+
+def legacy_group_decisions(decisions):
+    """The DataFrame/iterrows grouping that group_decisions replaced (the baseline)"""
+    county_month_rows = defaultdict(lambda: defaultdict(list))
+    df = pd.DataFrame(decisions)
+    if 'county' in df.columns and df['county'].notna().any():
+        for _, row in df.iterrows():
+            county = row['county']
+            if pd.notna(county):
+                month = pd.to_datetime(row['pronounced_date'], format='%d.%m.%Y').strftime('%B')
+                county_month_rows[county][month].append(tuple(row.get(field) for field in analyseBulletins.DECISION_FIELDS))
+    return {county: dict(month_rows) for county, month_rows in county_month_rows.items()}
+
+
+def as_written(county_month_rows):
+    """pandas turns missing values into NaN where the new path keeps None; both are written as empty CSV fields"""
+    return {county: {month: [tuple(None if value is None or pd.isna(value) else value for value in row) for row in rows]
+                     for month, rows in month_rows.items()}
+            for county, month_rows in county_month_rows.items()}
+
+
+def time_grouping(group, bulletins, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for decisions in bulletins:
+            group(decisions)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(bulletins)
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Per-bulletin cost of grouping decisions by county and month")
+    parser.add_argument("--bulletins", type=int, default=20, help="Synthetic bulletins")
+    parser.add_argument("--decisions", type=int, default=200, help="Decisions per synthetic bulletin")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bulletins = [analyseBulletins.extract_information_with_county(build_bulletin_text(args.decisions, seed))
+                 for seed in range(args.bulletins)]
+    # A decision without a county must be dropped by both
+    bulletins[0][0]['county'] = None
+
+    different = sum(as_written(legacy_group_decisions(decisions)) != as_written(analyseBulletins.group_decisions(decisions))
+                    for decisions in bulletins)
+    print(f"Grouped {args.bulletins} bulletins: {different} with different output")
+
+    before = time_grouping(legacy_group_decisions, bulletins, args.repeat)
+    after = time_grouping(analyseBulletins.group_decisions, bulletins, args.repeat)
+    print(f"Per bulletin ({args.decisions} decisions): DataFrame {before * 1000:.2f}ms, "
+          f"plain dicts {after * 1000:.2f}ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,63 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import main
+import scraperCommon
+from counties import counties
+from mockBerc import start_mock_server
+
+
+def run_engine(engine, server, county_list):
+    output_folder = tempfile.mkdtemp(prefix=f"bench-{engine}-")
+    scraperCommon.OUTPUT_FOLDER = output_folder
+    server.request_count = 0
+    server.throttled_count = 0
+    headers = scraperCommon.get_headers("benchmark")
+
+    start = time.perf_counter()
+    if engine == "async":
+        from asyncScraper import run_async
+        run_async(headers, county_list)
+    else:
+        main.run_threads(headers, county_list)
+    elapsed = time.perf_counter() - start
+
+    shutil.rmtree(output_folder, ignore_errors=True)
+    return server.request_count, server.throttled_count, elapsed
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Compare the threaded and async scraping engines on a local mock")
+    parser.add_argument("--counties", type=int, default=8, help="Number of counties to scrape")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock server latency per request (seconds)")
+    parser.add_argument("--base-size", type=int, default=150, help="Smallest county size in application numbers")
+    parser.add_argument("--empty-count", type=int, default=50, help="MAX_EMPTY_COUNT used for both engines")
+    parser.add_argument("--capacity", type=int, help="Mock answers 429 above this many concurrent requests")
+    parser.add_argument("--engines", default="threads,async")
+    args = parser.parse_args()
+
+    server, url = start_mock_server(latency=args.latency, base_size=args.base_size, capacity=args.capacity)
+    scraperCommon.API_BASE_URL = url
+    scraperCommon.MAX_EMPTY_COUNT = args.empty_count
+    county_list = counties[:args.counties]
+
+    results = {}
+    for engine in args.engines.split(","):
+        request_count, throttled_count, elapsed = run_engine(engine, server, county_list)
+        results[engine] = request_count / elapsed
+        print(f"\n{engine}: {request_count} requests ({throttled_count} throttled) in {elapsed:.2f}s "
+              f"-> {results[engine]:.1f} req/s")
+
+    server.shutdown()
+    if "threads" in results and "async" in results:
+        print(f"\nSpeedup (async vs threads): {results['async'] / results['threads']:.2f}x")
+
+
+if __name__ == "__main__":
+    main_benchmark()
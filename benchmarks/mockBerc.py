@@ -0,0 +1,123 @@
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the two BERC endpoints used by main.py
+PUBLICITY_PATH = "/client/api/publicitySituations"
+ARTICLE_PATH = "/backoffice/api/article/filter-article"
+RESOLUTIONS = ["Admis", "Respins", "Amânat"]
+SOURCE_CODES = ["PORTAL", "GHISEU", "EMAIL"]
+
+
+def county_size(county_name, base_size):
+    """Deterministic number of live application numbers for a county (1x to 4x base_size)"""
+    return base_size * (1 + zlib.crc32(county_name.encode('utf-8')) % 4)
+
+
+def has_publication(county_name, application_number, base_size, density):
+    if application_number > county_size(county_name, base_size):
+        return False
+    return zlib.crc32(f"{county_name}/{application_number}".encode('utf-8')) % 1000 < density * 1000
+
+
+def build_article(county_name, application_number):
+    rng = random.Random(f"{county_name}/{application_number}")
+    return {
+        "id": f"{county_name}-{application_number}",
+        "publication": {"nr": str(application_number)},
+        "applicationDate": f"2024-03-{rng.randint(1, 28):02d}T08:{rng.randint(0, 59):02d}:00Z",
+        "resolutionDate": f"2024-04-{rng.randint(1, 28):02d}T{rng.randint(6, 17):02d}:{rng.randint(0, 59):02d}:00Z",
+        "resolution": rng.choice(RESOLUTIONS),
+        "sourceCode": rng.choice(SOURCE_CODES)
+    }
+
+
+class MockBercHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        with server.lock:
+            server.request_count += 1
+            server.in_flight += 1
+            overloaded = server.capacity is not None and server.in_flight > server.capacity
+        try:
+            if overloaded:
+                server.throttled_count += 1
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if server.latency:
+                time.sleep(server.latency)
+            self.respond(payload)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def respond(self, payload):
+        server = self.server
+
+        county_name = payload.get("county", {}).get("name", "")
+        application_number = int(payload.get("applicationNumber", 0))
+
+        if self.path.startswith(PUBLICITY_PATH):
+            if has_publication(county_name, application_number, server.base_size, server.density):
+                body = [{"id": f"{county_name}-{application_number}"}]
+            else:
+                body = []
+        elif self.path.startswith(ARTICLE_PATH):
+            body = [build_article(county_name, application_number)]
+        else:
+            self.send_error(404)
+            return
+
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockBercServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients cancel their look-ahead requests when a county ends; dropped connections are expected
+        pass
+
+
+def start_mock_server(latency=0.02, base_size=200, density=0.7, capacity=None, port=0):
+    server = MockBercServer(("127.0.0.1", port), MockBercHandler)
+    server.latency = latency
+    server.base_size = base_size
+    server.density = density
+    server.capacity = capacity  # Concurrent requests served before answering 429 + Retry-After
+    server.request_count = 0
+    server.throttled_count = 0
+    server.in_flight = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    mock_server, url = start_mock_server()
+    print(f"Mock BERC API listening on {url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mock_server.shutdown()
@@ -0,0 +1,76 @@
+import html
+import os
+import random
+
+import pymupdf
+
+# Synthetic BPI bulletins in the layout extract_information_with_county expects, for the parser benchmarks
+COUNTIES = ["Argeș", "Bihor", "Cluj", "Constanța", "Iași", "Timiș", "Brașov", "Dolj"]
+REGISTRATORS = ["Popescu Ana", "Ionescu Mihai", "Dumitrescu Elena", "Stan Maria", "Georgescu Radu"]
+QUALITIES = ["administrator", "asociat unic", "împuternicit", None]
+
+
+def build_decision(rng, index, year=2024):
+    county = rng.choice(COUNTIES)
+    day, month = rng.randint(1, 28), rng.randint(1, 12)
+    quality = rng.choice(QUALITIES)
+    # Real bulletins have doubled spaces inside names and some decisions without a request or EUID line
+    requestor = rng.choice(REGISTRATORS).upper().replace(" ", "  ")
+    if rng.random() < 0.2:
+        request = f"depusă de {requestor} pentru"
+    elif quality:
+        request = f"formulată de {requestor} în calitate de {quality} al  EXEMPLU {index} SRL privind"
+    else:
+        request = f"formulată de {requestor} privind"
+    euid = f"Identificator unic la nivel european (EUID): ROONRC.J{rng.randint(1, 40):02d}/{index}/{year}\n" \
+        if rng.random() < 0.87 else ""
+    disposition = "\n".join(f"Admite cererea și dispune înregistrarea mențiunii {line}." for line in range(rng.randint(2, 6)))
+    return f"""R O M Â N I A
+MINISTERUL JUSTIȚIEI
+OFICIUL NAȚIONAL AL REGISTRULUI COMERȚULUI
+OFICIUL REGISTRULUI COMERȚULUI de pe lângă Tribunalul {county}
+DOSAR NR. {10000 + index}/{year}
+ÎNCHEIERE nr. {20000 + index}
+Registratorul de registrul comerțului: {rng.choice(REGISTRATORS)}
+Asupra cererii de înregistrare nr. {10000 + index} din {day:02d}.{month:02d}.{year}
+{request}
+înregistrarea în registrul comerțului a mențiunilor privind
+modificarea actului constitutiv.
+Examinând actele și lucrările dosarului, constată următoarele:
+cererea este întemeiată și îndeplinește condițiile legale.
+D I S P U N E
+{disposition}
+Registrator de registrul comerțului,
+{rng.choice(REGISTRATORS)}
+Firma: EXEMPLU {index} SRL
+Sediul: Municipiul {county}, Str. Principală nr. {rng.randint(1, 200)}
+Cod unic de înregistrare: {30000000 + index}
+Număr de ordine în registrul comerțului: J{rng.randint(1, 40):02d}/{index}/{year}
+{euid}Pronunțată în ședință publică.
+Data: {day:02d}.{month:02d}.{year}
+"""
+
+
+def build_bulletin_text(decision_count, seed=0):
+    rng = random.Random(seed)
+    return "\n".join(build_decision(rng, seed * 100000 + index) for index in range(decision_count))
+
+
+def write_bulletin_pdf(path, decision_count, seed=0):
+    """Multi-page PDF whose decisions flow across page breaks like the real bulletins"""
+    story = pymupdf.Story(f"<pre style='font-size: 8px'>{html.escape(build_bulletin_text(decision_count, seed))}</pre>")
+    mediabox = pymupdf.paper_rect("a4")
+    writer = pymupdf.DocumentWriter(path)
+    more = True
+    while more:
+        device = writer.begin_page(mediabox)
+        more, _ = story.place(mediabox + (36, 36, -36, -36))
+        story.draw(device)
+        writer.end_page()
+    writer.close()
+
+
+def write_bulletin_folder(year_dir, file_count, decision_count):
+    os.makedirs(year_dir, exist_ok=True)
+    for number in range(1, file_count + 1):
+        write_bulletin_pdf(os.path.join(year_dir, f"{number}.pdf"), decision_count, seed=number)
@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from glob import glob
+
+# One row per bulletin (year, number), shared by downloadBulletins.py and analyseBulletins.py.
+# status: downloaded | failed | missing (no such publication) | corrupt
+# parse_status: pending | parsed | failed
+MANIFEST_FILENAME = "manifest.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bulletins (
+    year INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    sha256 TEXT,
+    byte_size INTEGER,
+    downloaded_at TEXT,
+    parse_status TEXT NOT NULL DEFAULT 'pending',
+    decision_count INTEGER,
+    parse_error TEXT,
+    parsed_at TEXT,
+    PRIMARY KEY (year, number)
+);
+CREATE INDEX IF NOT EXISTS bulletins_status ON bulletins (year, status, number);
+CREATE INDEX IF NOT EXISTS bulletins_parse_status ON bulletins (year, parse_status, number);
+"""
+
+
+def manifest_path(bulletins_dir):
+    return os.path.join(bulletins_dir, MANIFEST_FILENAME)
+
+
+def bulletin_from_path(pdf_path):
+    """(year, number) for bulletins/<year>/<number>.pdf"""
+    year = os.path.basename(os.path.dirname(os.path.abspath(pdf_path)))
+    number = os.path.splitext(os.path.basename(pdf_path))[0]
+    return int(year), int(number)
+
+
+class BulletinManifest:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            cursor = self.connection.execute(sql, params)
+            self.connection.commit()
+            return cursor
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    # Downloads
+
+    def record_attempt(self, year, number):
+        self._execute("""
+            INSERT INTO bulletins (year, number, status, attempts) VALUES (?, ?, 'failed', 1)
+            ON CONFLICT (year, number) DO UPDATE SET attempts = attempts + 1
+        """, (year, number))
+
+    def mark_downloaded(self, year, number, sha256, byte_size):
+        self._execute("""
+            INSERT INTO bulletins (year, number, status, attempts, sha256, byte_size, downloaded_at)
+            VALUES (?, ?, 'downloaded', 1, ?, ?, ?)
+            ON CONFLICT (year, number) DO UPDATE SET
+                status = 'downloaded', last_error = NULL, sha256 = excluded.sha256,
+                byte_size = excluded.byte_size, downloaded_at = excluded.downloaded_at,
+                parse_status = 'pending', decision_count = NULL, parse_error = NULL, parsed_at = NULL
+        """, (year, number, sha256, byte_size, datetime.now().isoformat()))
+
+    def mark_failed(self, year, number, error, status="failed"):
+        self._execute("""
+            INSERT INTO bulletins (year, number, status, attempts, last_error) VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT (year, number) DO UPDATE SET status = excluded.status, last_error = excluded.last_error
+        """, (year, number, status, error))
+
+    def downloaded_numbers(self, year):
+        rows = self._query("SELECT number FROM bulletins WHERE year = ? AND status = 'downloaded'", (year,))
+        return {number for (number,) in rows}
+
+    def last_downloaded(self, year):
+        (number,), = self._query("SELECT MAX(number) FROM bulletins WHERE year = ? AND status = 'downloaded'",
+                                 (year,))
+        return number or 0
+
+    def gaps(self, year, up_to):
+        """Numbers 1..up_to that are not downloaded"""
+        rows = self._query("""
+            WITH RECURSIVE numbers(n) AS (SELECT 1 WHERE ? >= 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < ?)
+            SELECT n FROM numbers
+            WHERE NOT EXISTS (
+                SELECT 1 FROM bulletins WHERE year = ? AND number = n AND status = 'downloaded'
+            )
+        """, (up_to, up_to, year))
+        return [number for (number,) in rows]
+
+    def import_directory(self, year, year_dir, read_checksum=None):
+        """Register the PDFs of the year folder that have no 'downloaded' row: downloads from before the manifest
+        existed or files copied in by hand. Completed PDFs are only ever renamed into place, so an existing file is
+        downloaded whatever its row says. Cheap enough to run on every start."""
+        known = self.downloaded_numbers(year)
+        rows = []
+        for pdf_path in glob(os.path.join(year_dir, "*.pdf")):
+            number = int(os.path.splitext(os.path.basename(pdf_path))[0])
+            if number in known:
+                continue
+            checksum = read_checksum(pdf_path) if read_checksum else None
+            rows.append((year, number, checksum, os.path.getsize(pdf_path), datetime.now().isoformat()))
+        with self.lock:
+            self.connection.executemany("""
+                INSERT INTO bulletins (year, number, status, attempts, sha256, byte_size, downloaded_at)
+                VALUES (?, ?, 'downloaded', 1, ?, ?, ?)
+                ON CONFLICT (year, number) DO UPDATE SET
+                    status = 'downloaded', last_error = NULL, sha256 = excluded.sha256,
+                    byte_size = excluded.byte_size, downloaded_at = excluded.downloaded_at
+            """, rows)
+            self.connection.commit()
+        return len(rows)
+
+    # Parsing
+
+    def mark_parsed(self, year, number, decision_count):
+        self._execute("""
+            UPDATE bulletins SET parse_status = 'parsed', decision_count = ?, parse_error = NULL, parsed_at = ?
+            WHERE year = ? AND number = ?
+        """, (decision_count, datetime.now().isoformat(), year, number))
+
+    def mark_parse_failed(self, year, number, error):
+        self._execute("""
+            UPDATE bulletins SET parse_status = 'failed', parse_error = ?, parsed_at = ?
+            WHERE year = ? AND number = ?
+        """, (error, datetime.now().isoformat(), year, number))
+
+    def parse_failures(self, year):
+        """number -> parse_error of the downloaded bulletins whose last parse failed"""
+        rows = self._query("""
+            SELECT number, parse_error FROM bulletins
+            WHERE year = ? AND parse_status = 'failed' AND status = 'downloaded' ORDER BY number
+        """, (year,))
+        return dict(rows)
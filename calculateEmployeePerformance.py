@@ -1,101 +1,136 @@
+import argparse
 import pandas as pd
-import unicodedata
 import os
 from glob import glob
-
-def normalize_text(text):
-    """Change diacritics to their base form, convert to lowercase, and sort words"""
-    if pd.isna(text) or not isinstance(text, str):
-        return text
-    normalized = ''.join(c for c in unicodedata.normalize('NFD', str(text).lower())
-                         if unicodedata.category(c) != 'Mn')
-    return ' '.join(sorted(normalized.split()))
+from decisionLoader import load_csv_files
+from performanceAggregates import PerformanceAggregates, AGGREGATES_FILENAME, daily_counts
+from registratorNames import NameTable, MAX_NAME_LENGTH, resolve_registrators, save_canonical_names
+from throughputMetrics import registrator_metrics, DAILY_PERCENTILES, ROLLING_WINDOWS
 
 # Step 1: Read all CSV files from counties-new/[County]/[Months].csv
 base_path = 'bulletins-analysis/counties-new'
 output_file_path = 'bulletins-analysis/performance-revision.xlsx'
+# Decisions per registrator and per county on every day, with trailing 7/30-day totals
+registrator_daily_path = 'bulletins-analysis/performance-daily-registrators.csv'
+county_daily_path = 'bulletins-analysis/performance-daily-counties.csv'
+
+# Daily decision counts of every CSV file read so far; only new or changed files are read again
+aggregates_path = os.path.join('bulletins-analysis', AGGREGATES_FILENAME)
+
+# The only columns the report reads; decisionLoader parses pronounced_date
+report_columns = ['pronounced_date', 'registrator']
 
-# Function to read and process a single CSV file
-def process_csv(file_path):
+# Normalized registrator names, reused across files and runs
+name_table = NameTable()
+
+# Function to process the columns loaded from a single CSV file: the rows with a date and a registrator name
+def process_csv(file_path, df, error):
+    if error:
+        print(f"Error processing file {file_path}: {error}")
+        return None
     try:
-        df = pd.read_csv(file_path, encoding='utf-8', low_memory=False)
         if df.empty:
             print(f"Warning: Empty file: {file_path}")
-            return None
+            return df.assign(original_name=pd.Series(dtype=object))
         df['original_name'] = df['registrator'].astype(str).str.replace('-', ' ')
-        df['registrator'] = df['original_name'].apply(normalize_text)
-        df = df[df['registrator'].str.len() <= 45]
-        df['pronounced_date'] = pd.to_datetime(df['pronounced_date'], format='%d.%m.%Y', errors='coerce')
-        df = df.dropna(subset=['pronounced_date'])
+        df = df.dropna(subset=['pronounced_date', 'original_name'])
         if df.empty:
             print(f"Warning: No valid data after processing: {file_path}")
-            return None
         return df
     except Exception as e:
         print(f"Error processing file {file_path}: {str(e)}")
         return None
 
-# Read and concatenate all CSV files
-all_files = glob(os.path.join(base_path, '*', '*.csv'))
-if not all_files:
-    raise ValueError(f"No CSV files found in {base_path}")
-
-print(f"Found {len(all_files)} CSV files.")
-
-df_list = [process_csv(file) for file in all_files]
-df_list = [df for df in df_list if df is not None]
-
-if not df_list:
-    raise ValueError("No valid data found in any of the CSV files")
-
-df = pd.concat(df_list, ignore_index=True)
-
-# Count total rows and rows with missing dates
-total_rows = sum(len(df) for df in df_list)
-rows_with_data = len(df)
-missing_dates = total_rows - rows_with_data
-
-print(f"Total rows in all files: {total_rows}")
-print(f"Rows with valid data: {rows_with_data}")
-print(f"Rows dropped due to missing dates: {missing_dates}")
-
-# Step 2: Calculate performance metrics and find most frequent original name
-days_worked = df.groupby('registrator')['pronounced_date'].nunique()
-dossiers_processed = df.groupby('registrator').size()
-
-# Find most frequent original name for each normalized name
-most_frequent_names = df.groupby('registrator')['original_name'].agg(
-    lambda x: x.value_counts().index[0]
-)
-
-performance_df = pd.DataFrame({
-    'most_frequent_name': most_frequent_names,
-    'days_worked': days_worked,
-    'dossiers_processed': dossiers_processed
-}).reset_index()
-
-# Step 3: Calculate performance ratios
-performance_df['dossiers_per_day'] = performance_df['dossiers_processed'] / performance_df['days_worked']
-performance_df['dossiers_per_hour'] = performance_df['dossiers_per_day'] / 8  # Assuming 8-hour workday
-
-# Sort the DataFrame by dossiers_per_day in descending order
-performance_df = performance_df.sort_values('dossiers_per_day', ascending=False)
-
-# Rename columns for clarity
-performance_df = performance_df.rename(columns={
-    'registrator': 'normalized_name',
-    'most_frequent_name': 'registrator'
-})
-
-# Reorder columns
-column_order = ['registrator', 'normalized_name', 'days_worked', 'dossiers_processed', 'dossiers_per_day', 'dossiers_per_hour']
-performance_df = performance_df[column_order]
-
-# Step 4: Save the results as performance.xlsx (excel file) and performance.csv with UTF-8 encoding
-performance_df.to_excel(output_file_path, index=False)
-performance_df.to_csv(output_file_path.replace('.xlsx', '.csv'), index=False, encoding='utf-8')
 
-print(f"Performance files saved to {output_file_path} and {output_file_path.replace('.xlsx', '.csv')}")
-print(f"Total rows processed: {total_rows}")
-print(f"Rows with valid dates: {rows_with_data}")
-print(f"Number of rows with missing dates dropped: {missing_dates}")
\ No newline at end of file
+def update_aggregates(aggregates, all_files):
+    """Read the new or changed CSV files into the aggregates; files that could not be read are retried next run"""
+    removed = aggregates.forget_missing(all_files)
+    stale_files = aggregates.stale_files(all_files)
+    print(f"{len(stale_files)} new or changed CSV files to read, {len(all_files) - len(stale_files)} unchanged, "
+          f"{removed} removed")
+
+    # Taken before reading, so a file written to meanwhile is read again on the next run
+    stats = {file_path: os.stat(file_path) for file_path in stale_files}
+    for file_path, loaded, error in load_csv_files(stale_files, report_columns):
+        df = process_csv(file_path, loaded, error)
+        if df is not None:
+            aggregates.replace_partition(file_path, daily_counts(df), len(loaded), stats[file_path])
+
+def main():
+    parser = argparse.ArgumentParser(description="Registrator performance report from the decision CSV files")
+    parser.add_argument("--rebuild", action="store_true", help="Read every CSV file again instead of only changed ones")
+    args = parser.parse_args()
+
+    all_files = glob(os.path.join(base_path, '*', '*.csv'))
+    if not all_files:
+        raise ValueError(f"No CSV files found in {base_path}")
+
+    print(f"Found {len(all_files)} CSV files.")
+
+    if args.rebuild and os.path.exists(aggregates_path):
+        os.remove(aggregates_path)
+    aggregates = PerformanceAggregates(aggregates_path)
+    update_aggregates(aggregates, all_files)
+
+    # One row per county, day and name as written, with its number of decisions
+    df = aggregates.daily_counts()
+    total_rows = aggregates.total_rows()
+    aggregates.close()
+    if df.empty:
+        raise ValueError("No valid data found in any of the CSV files")
+
+    df['registrator'] = name_table.normalize_series(df['original_name'])
+    name_table.save()
+    df = df[df['registrator'].str.len() <= MAX_NAME_LENGTH].copy()
+
+    # Spelling and OCR variants of one registrator are counted together; the mapping is saved for other tools
+    decision_counts = df.groupby('registrator')['decisions'].sum().to_dict()
+    canonical_names = resolve_registrators(decision_counts)
+    save_canonical_names(canonical_names, decision_counts)
+    df['registrator'] = df['registrator'].map(canonical_names)
+
+    # A few hundred distinct names: grouping on their categorical codes instead of the strings
+    df['registrator'] = df['registrator'].astype('category')
+
+    # Count total rows and rows dropped for a missing date or registrator name
+    rows_with_data = int(df['decisions'].sum())
+    missing_dates = total_rows - rows_with_data
+
+    print(f"Total rows in all files: {total_rows}")
+    print(f"Rows with valid data: {rows_with_data}")
+    print(f"Rows dropped due to missing dates or names: {missing_dates}")
+
+    # Step 2 and 3: Daily counts, performance ratios, daily percentiles, best rolling windows and the most
+    # frequent original name per registrator, in one pass over the categorical codes (see throughputMetrics.py)
+    performance_df, registrator_daily, county_daily = registrator_metrics(df, weight_column='decisions')
+    performance_df = performance_df.reset_index()
+
+    # Sort the DataFrame by dossiers_per_day in descending order
+    performance_df = performance_df.sort_values('dossiers_per_day', ascending=False)
+
+    # Rename columns for clarity
+    performance_df = performance_df.rename(columns={
+        'registrator': 'normalized_name',
+        'most_frequent_name': 'registrator'
+    })
+
+    # Reorder columns
+    column_order = ['registrator', 'normalized_name', 'days_worked', 'dossiers_processed', 'dossiers_per_day', 'dossiers_per_hour'] + \
+        [f'daily_p{percent}' for percent in DAILY_PERCENTILES] + [f'best_{window}_days' for window in ROLLING_WINDOWS]
+    performance_df = performance_df[column_order]
+
+    # Step 4: Save the results as performance.xlsx (excel file) and performance.csv with UTF-8 encoding
+    performance_df.to_excel(output_file_path, index=False)
+    performance_df.to_csv(output_file_path.replace('.xlsx', '.csv'), index=False, encoding='utf-8')
+    registrator_daily.to_csv(registrator_daily_path, index=False, encoding='utf-8')
+    county_daily.to_csv(county_daily_path, index=False, encoding='utf-8')
+
+    print(f"Performance files saved to {output_file_path} and {output_file_path.replace('.xlsx', '.csv')}")
+    print(f"Daily counts saved to {registrator_daily_path} and {county_daily_path}")
+    print(f"Total rows processed: {total_rows}")
+    print(f"Rows with valid dates and names: {rows_with_data}")
+    print(f"Number of rows with missing dates or names dropped: {missing_dates}")
+
+
+if __name__ == "__main__":
+    main()
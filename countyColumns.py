@@ -0,0 +1,110 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from countyStorage import iter_records, list_county_files
+
+# Typed columns of the scraped county records for the visualizations, so regenerating the charts does not
+# parse every results/counties file again:
+#   <county folder>/column-cache/<records file name>.npz
+# Only the fields the charts use are kept: the two dates as Europe/Bucharest wall-clock datetime64 (NaT when
+# missing or invalid) and the resolution / source code as category codes (-1 when missing). An entry is
+# rebuilt when the size or mtime of its records file changes (the append-only formats grow on every save).
+COLUMN_CACHE_FOLDER = "column-cache"
+COLUMN_CACHE_VERSION = 1  # Bump when the cached columns change
+TIMEZONE = 'Europe/Bucharest'
+
+DATE_FIELDS = {'resolution_date': 'resolutionDate', 'application_date': 'applicationDate'}
+CATEGORY_FIELDS = {'resolution': 'resolution', 'source_code': 'sourceCode'}
+
+
+def cache_path(file_path):
+    folder, file_name = os.path.split(file_path)
+    return os.path.join(folder, COLUMN_CACHE_FOLDER, f"{file_name}.npz")
+
+
+def source_stamp(file_path):
+    stat = os.stat(file_path)
+    return np.array([COLUMN_CACHE_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def local_dates(values):
+    """ISO 8601 strings (offset or Z) -> Bucharest wall-clock datetime64[s]; invalid or missing -> NaT"""
+    dates = pd.to_datetime(pd.Series(values, dtype=object), utc=True, errors='coerce', format='ISO8601')
+    return dates.dt.tz_convert(TIMEZONE).dt.tz_localize(None).to_numpy().astype('datetime64[s]')
+
+
+def category_codes(values):
+    codes, categories = pd.factorize(pd.Series(values, dtype=object), sort=True)
+    return codes.astype(np.int32), np.asarray(categories, dtype=str)
+
+
+def extract_columns(file_path):
+    values = {field: [] for field in (*DATE_FIELDS.values(), *CATEGORY_FIELDS.values())}
+    for record in iter_records(file_path):
+        for field, column in values.items():
+            column.append(record.get(field))
+
+    arrays = {}
+    for name, field in DATE_FIELDS.items():
+        arrays[name] = local_dates(values[field])
+    for name, field in CATEGORY_FIELDS.items():
+        arrays[name], arrays[f"{name}_categories"] = category_codes(values[field])
+    return arrays
+
+
+def write_cache(path, arrays, stamp):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        np.savez(f, stamp=stamp, **arrays)
+    os.replace(temp_path, path)
+
+
+def read_cache(path, stamp):
+    """The cached arrays, or None when there is no entry for this version of the records file"""
+    try:
+        with np.load(path) as cached:
+            if not np.array_equal(cached['stamp'], stamp):
+                return None
+            return {name: cached[name] for name in cached.files if name != 'stamp'}
+    except (FileNotFoundError, ValueError, KeyError, OSError):
+        return None
+
+
+def load_county_columns(file_path, refresh=False):
+    """DataFrame of resolution_date, application_date (datetime64), resolution and source_code (category)
+    for the records of one county file, from the column cache when it is up to date"""
+    path = cache_path(file_path)
+    stamp = source_stamp(file_path)
+    arrays = None if refresh else read_cache(path, stamp)
+    if arrays is None:
+        arrays = extract_columns(file_path)
+        write_cache(path, arrays, stamp)
+
+    df = pd.DataFrame({name: arrays[name] for name in DATE_FIELDS})
+    for name in CATEGORY_FIELDS:
+        df[name] = pd.Categorical.from_codes(arrays[name], arrays[f"{name}_categories"])
+    return df
+
+
+def load_all_counties(county_folder, refresh=False):
+    """county -> load_county_columns of its records file, for every county in the folder"""
+    for county, file_path in list_county_files(county_folder).items():
+        yield county, load_county_columns(file_path, refresh=refresh)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the column cache of the scraped county records")
+    parser.add_argument("county_folder", nargs="?", default="results/counties")
+    parser.add_argument("--refresh", action="store_true", help="Rebuild every entry")
+    args = parser.parse_args()
+
+    for county, df in load_all_counties(args.county_folder, refresh=args.refresh):
+        print(f"{county}: {len(df)} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import threading
+import unicodedata
+from functools import lru_cache
+
+from fuzzywuzzy import process, utils
+
+from counties import counties
+
+# Resolves the "Tribunalul X" capture of a decision to a county name from counties.py.
+# Exact lookups (diacritics/case/punctuation-insensitive name, or the mnemonic) answer almost every call;
+# fuzzy matching only runs for captures never seen before and its answers are kept in a bounded LRU cache.
+FUZZY_THRESHOLD = 80  # Minimum fuzzywuzzy score for a fuzzy match
+FUZZY_CACHE_SIZE = 1024
+
+
+def normalize_text(text):
+    """Change diacritics to their base form (ş and ș both become s)"""
+    return ''.join(c for c in unicodedata.normalize('NFD', text)
+                   if unicodedata.category(c) != 'Mn')
+
+
+def lookup_key(text):
+    """What fuzzywuzzy compares: diacritic-free, lowercase, punctuation replaced by spaces"""
+    return utils.full_process(normalize_text(text))
+
+
+class CountyResolver:
+    def __init__(self, county_list=counties, threshold=FUZZY_THRESHOLD, cache_size=FUZZY_CACHE_SIZE):
+        # Same candidate order as the old alphabetical county list, so fuzzy ties resolve the same way
+        self.names = sorted((county['name'] for county in county_list), key=normalize_text)
+        self.normalized_names = [normalize_text(name) for name in self.names]
+        self.by_key = {lookup_key(name): name for name in self.names}
+        self.by_mnemonic = {county['mnemonic']: county['name'] for county in county_list}
+        self.threshold = threshold
+        self.fuzzy_match = lru_cache(maxsize=cache_size)(self._fuzzy_match)
+        self.counts = {"exact": 0, "mnemonic": 0, "fuzzy": 0, "unresolved": 0}
+        self.lock = threading.Lock()
+
+    def _fuzzy_match(self, normalized_county):
+        best_match = process.extractOne(normalized_county, self.normalized_names)
+        if best_match and best_match[1] >= self.threshold:
+            return self.names[self.normalized_names.index(best_match[0])]
+        return None
+
+    def _count(self, outcome):
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def resolve(self, county):
+        if not county:
+            return None
+        # A capture whose processed form equals a county's scores 100, so the exact lookup gives the same
+        # answer fuzzy matching would
+        name = self.by_key.get(lookup_key(county))
+        if name:
+            self._count("exact")
+            return name
+        name = self.by_mnemonic.get(county.strip())
+        if name:
+            self._count("mnemonic")
+            return name
+        name = self.fuzzy_match(normalize_text(county))
+        self._count("fuzzy" if name else "unresolved")
+        return name
+
+    def stats(self):
+        """Lookup counts; fuzzy_calls is how often fuzzywuzzy actually ran (fuzzy cache misses)"""
+        cache = self.fuzzy_match.cache_info()
+        with self.lock:
+            counts = dict(self.counts)
+        counts["fuzzy_calls"] = cache.misses
+        counts["fuzzy_cache_hits"] = cache.hits
+        counts["fuzzy_cache_size"] = cache.currsize
+        return counts
+
+
+def format_stats(stats):
+    lookups = stats["exact"] + stats["mnemonic"] + stats["fuzzy"] + stats["unresolved"]
+    return (f"County lookups: {lookups} ({stats['exact']} exact, {stats['mnemonic']} mnemonic, "
+            f"{stats['fuzzy']} fuzzy, {stats['unresolved']} unresolved); "
+            f"fuzzy matching ran {stats['fuzzy_calls']} times, {stats['fuzzy_cache_hits']} cache hits")
+
+
+resolver = CountyResolver()
+
+
+def resolve_county(county):
+    return resolver.resolve(county)
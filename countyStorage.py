@@ -0,0 +1,242 @@
+import argparse
+import gzip
+import json
+import os
+
+# Storage for scraped county records (results/counties/<county>.<ext>).
+# "json" is the original single-array file, rewritten on every save.
+# "jsonl" and "jsonl.gz" are append-only: each save appends one batch with a single write + fsync,
+# so a crash can only lose (part of) the batch being written, never the records before it.
+EXTENSIONS = {
+    "jsonl.gz": ".jsonl.gz",
+    "jsonl": ".jsonl",
+    "json": ".json",
+}
+
+
+def records_path(county_folder, county_name, storage_format):
+    return os.path.join(county_folder, f"{county_name}{EXTENSIONS[storage_format]}")
+
+
+def storage_format_of(path):
+    for storage_format, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return storage_format
+    raise ValueError(f"Unknown county records format: {path}")
+
+
+def encode_batch(records, compress):
+    data = ''.join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode('utf-8')
+    # Every batch is a complete gzip member; concatenated members are a valid gzip stream
+    return gzip.compress(data) if compress else data
+
+
+def truncate_partial_line(path):
+    """Drop an incomplete last line left by an interrupted write to a plain .jsonl file"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        position = size
+        while position > 0:
+            chunk_start = max(0, position - 65536)
+            f.seek(chunk_start)
+            chunk = f.read(position - chunk_start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                if chunk_start + newline + 1 != size:
+                    f.truncate(chunk_start + newline + 1)
+                return
+            position = chunk_start
+        f.truncate(0)
+
+
+def append_records(path, records):
+    """Append records to a .jsonl/.jsonl.gz file and return the new file size in bytes"""
+    storage_format = storage_format_of(path)
+    if storage_format == "json":
+        raise ValueError("append_records only supports the jsonl formats")
+    if storage_format == "jsonl":
+        truncate_partial_line(path)
+
+    data = encode_batch(records, compress=storage_format == "jsonl.gz")
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def iter_records(path):
+    storage_format = storage_format_of(path)
+    if storage_format == "json":
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+
+    opener = gzip.open if storage_format == "jsonl.gz" else open
+    with opener(path, 'rb') as f:
+        try:
+            for line in f:
+                # A line without its newline is the tail of an interrupted batch
+                if not line.endswith(b"\n"):
+                    break
+                yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile):
+            return
+
+
+def load_records(path):
+    return list(iter_records(path))
+
+
+def record_number(record):
+    """Application number the scraper resumes from (publication.nr), or None"""
+    if record and 'publication' in record and 'nr' in record['publication']:
+        return int(record['publication']['nr'])
+    return None
+
+
+# Checkpoints: <records file>.checkpoint is a small JSON document replaced atomically after every save.
+# byte_offset is the size of the records file when the checkpoint was written; anything past it on
+# disk is an interrupted batch and is cut off before resuming.
+def checkpoint_path(path):
+    return path + ".checkpoint"
+
+
+def write_checkpoint(path, last_processed, record_count, byte_offset):
+    checkpoint = {
+        "last_processed": last_processed,
+        "record_count": record_count,
+        "byte_offset": byte_offset,
+    }
+    temp_path = checkpoint_path(path) + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, checkpoint_path(path))
+    return checkpoint
+
+
+def read_checkpoint(path):
+    try:
+        with open(checkpoint_path(path), 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        return {key: checkpoint[key] for key in ("last_processed", "record_count", "byte_offset")}
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+        return None
+
+
+def gzip_stream_is_complete(path):
+    try:
+        with gzip.open(path, 'rb') as f:
+            while f.read(1 << 20):
+                pass
+        return True
+    except (EOFError, gzip.BadGzipFile):
+        return False
+
+
+def rebuild_checkpoint(path):
+    """Scan the records file once and write a fresh checkpoint for it"""
+    if storage_format_of(path) == "jsonl":
+        truncate_partial_line(path)
+
+    record_count = 0
+    last_processed = 0
+    for record in iter_records(path):
+        record_count += 1
+        last_processed = record_number(record) or last_processed
+
+    if storage_format_of(path) == "jsonl.gz" and not gzip_stream_is_complete(path):
+        # iter_records stops quietly at a damaged member; rewrite so later appends stay readable
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(encode_batch(load_records(path), compress=True))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    return write_checkpoint(path, last_processed, record_count, os.path.getsize(path))
+
+
+def load_checkpoint(path):
+    """Checkpoint for a records file, repairing the file or rebuilding the checkpoint when they disagree"""
+    if not os.path.exists(path):
+        return {"last_processed": 0, "record_count": 0, "byte_offset": 0}
+
+    checkpoint = read_checkpoint(path)
+    if checkpoint is None:
+        print(f"No checkpoint for {path}, rebuilding it from the data")
+        return rebuild_checkpoint(path)
+
+    file_size = os.path.getsize(path)
+    if file_size > checkpoint["byte_offset"] and storage_format_of(path) != "json":
+        with open(path, 'rb+') as f:
+            f.truncate(checkpoint["byte_offset"])
+    elif file_size != checkpoint["byte_offset"]:
+        print(f"Checkpoint for {path} does not match the data, rebuilding it")
+        return rebuild_checkpoint(path)
+    return checkpoint
+
+
+def find_records_file(county_folder, county_name):
+    """Return the existing records file for a county, preferring the append-only formats"""
+    for storage_format in EXTENSIONS:
+        path = records_path(county_folder, county_name, storage_format)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def list_county_files(county_folder):
+    """Map county name -> records file for every county in the folder (one file per county)"""
+    county_files = {}
+    for file_name in sorted(os.listdir(county_folder)):
+        for storage_format, extension in EXTENSIONS.items():
+            if file_name.endswith(extension):
+                county = file_name[:-len(extension)]
+                county_files.setdefault(county, find_records_file(county_folder, county))
+                break
+    return county_files
+
+
+def convert_json_file(json_path, compress=False, remove_source=False):
+    """Convert a legacy <county>.json array into <county>.jsonl(.gz), written atomically"""
+    storage_format = "jsonl.gz" if compress else "jsonl"
+    target_path = json_path[:-len(".json")] + EXTENSIONS[storage_format]
+    temp_path = target_path + ".tmp"
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    with open(temp_path, 'wb') as f:
+        f.write(encode_batch(records, compress))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, target_path)
+
+    last_processed = next((number for number in map(record_number, reversed(records)) if number), 0)
+    write_checkpoint(target_path, last_processed, len(records), os.path.getsize(target_path))
+
+    if remove_source:
+        os.remove(json_path)
+    return target_path, len(records)
+
+
+def convert_folder(county_folder, compress=False, remove_source=False):
+    for file_name in sorted(os.listdir(county_folder)):
+        if file_name.endswith(".json"):
+            target_path, record_count = convert_json_file(os.path.join(county_folder, file_name), compress,
+                                                          remove_source)
+            print(f"Converted {file_name} -> {os.path.basename(target_path)} ({record_count} records)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert results/counties/*.json to append-only JSONL")
+    parser.add_argument("folder", nargs="?", default="results/counties")
+    parser.add_argument("--compress", action="store_true", help="Write .jsonl.gz instead of .jsonl")
+    parser.add_argument("--remove-source", action="store_true", help="Delete the .json files after converting")
+    args = parser.parse_args()
+    convert_folder(args.folder, args.compress, args.remove_source)
@@ -0,0 +1,217 @@
+import argparse
+import os
+import uuid
+from datetime import datetime
+from glob import glob
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Parquet copy of the bulletin decisions, partitioned like the CSV folders:
+#   <dataset>/county=<County>/month=<Month>/part-<id>.parquet
+# Every save appends a small part file; compact_dataset() merges them into one file per partition.
+# county and month live in the directory names and are read back as dictionary-encoded columns.
+COMPACT_ROW_GROUP_SIZE = 128 * 1024
+SUPERSEDES_KEY = b"supersedes"  # Footer metadata of a compacted file: the part files it replaced
+
+SCHEMA = pa.schema([
+    ("dossier_number", pa.string()),
+    ("decision_number", pa.int64()),
+    ("pronounced_date", pa.date32()),
+    ("firm_name", pa.string()),
+    ("address", pa.string()),
+    ("registration_code", pa.int64()),
+    ("registration_order", pa.string()),
+    ("euid", pa.string()),
+    ("registrator", pa.string()),
+    ("requestor", pa.string()),
+    ("quality", pa.string()),
+    ("request_details", pa.string()),
+    ("disposition_text", pa.string()),
+    ("source_file", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("county", pa.string()), ("month", pa.string())]), flavor="hive")
+PARTITION_KEYS = ("county", "month")
+
+
+def is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def to_int(value):
+    """Digits (or a float read back from an old CSV) -> int; anything else -> None"""
+    if is_missing(value):
+        return None
+    if isinstance(value, float):
+        return int(value)
+    value = str(value).strip()
+    return int(value) if value.isdecimal() else None
+
+
+def to_date(value):
+    if is_missing(value):
+        return None
+    try:
+        return datetime.strptime(str(value), '%d.%m.%Y').date()
+    except ValueError:
+        return None
+
+
+def to_string(value):
+    return None if is_missing(value) else str(value)
+
+
+CONVERTERS = {"decision_number": to_int, "registration_code": to_int, "pronounced_date": to_date}
+
+
+def decisions_to_table(decisions):
+    """Decision dicts (as produced by analyseBulletins) -> typed Arrow table; county/month are not stored"""
+    columns = {}
+    for field in SCHEMA:
+        convert = CONVERTERS.get(field.name, to_string)
+        columns[field.name] = pa.array([convert(decision.get(field.name)) for decision in decisions], type=field.type)
+    return pa.table(columns, schema=SCHEMA)
+
+
+def partition_dir(dataset_dir, county, month):
+    return os.path.join(dataset_dir, f"county={county}", f"month={month}")
+
+
+def write_part(path, table, metadata=None):
+    """Write atomically: readers only ever see complete part-*.parquet files"""
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    temp_path = path + ".tmp"
+    pq.write_table(table, temp_path, row_group_size=COMPACT_ROW_GROUP_SIZE)
+    with open(temp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def append_decisions(dataset_dir, county, month, decisions):
+    directory = partition_dir(dataset_dir, county, month)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet")
+    write_part(path, decisions_to_table(decisions))
+    return path
+
+
+def superseded_files(paths):
+    """Part files already merged into a compacted file (left behind if compaction stopped before deleting them)"""
+    superseded = set()
+    for path in paths:
+        metadata = pq.read_schema(path).metadata or {}
+        if SUPERSEDES_KEY in metadata:
+            directory = os.path.dirname(path)
+            superseded.update(os.path.join(directory, name) for name in metadata[SUPERSEDES_KEY].decode().split(","))
+    return superseded
+
+
+def partition_files(directory):
+    paths = sorted(glob(os.path.join(directory, "part-*.parquet")))
+    superseded = superseded_files(paths)
+    return [path for path in paths if path not in superseded]
+
+
+def compact_partition(directory):
+    """Merge every part file of a partition into one; returns the number of files merged"""
+    all_paths = sorted(glob(os.path.join(directory, "part-*.parquet")))
+    superseded = superseded_files(all_paths)
+    paths = [path for path in all_paths if path not in superseded]
+    if len(paths) > 1:
+        table = pa.concat_tables(pq.read_table(path, schema=SCHEMA) for path in paths)
+        target = os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet")
+        write_part(target, table, {SUPERSEDES_KEY: ",".join(os.path.basename(path) for path in paths).encode()})
+        superseded.update(paths)
+    for path in superseded:
+        if os.path.exists(path):
+            os.remove(path)
+    return len(paths) if len(paths) > 1 else 0
+
+
+def remove_sources(dataset_dir, county, month, sources):
+    """Drop the rows of the given source files from a partition; returns the number of rows removed.
+    The remaining rows are written as one file that supersedes the current parts."""
+    directory = partition_dir(dataset_dir, county, month)
+    paths = partition_files(directory) if os.path.isdir(directory) else []
+    if not paths:
+        return 0
+    table = pa.concat_tables(pq.read_table(path, schema=SCHEMA) for path in paths)
+    keep = pc.invert(pc.fill_null(pc.is_in(table["source_file"], value_set=pa.array(sources, pa.string())), False))
+    removed = len(table) - pc.sum(keep.cast(pa.int64())).as_py()
+    if removed:
+        target = os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet")
+        write_part(target, table.filter(keep), {SUPERSEDES_KEY: ",".join(os.path.basename(path) for path in paths).encode()})
+        for path in paths:
+            os.remove(path)
+    return removed
+
+
+def compact_dataset(dataset_dir):
+    merged = 0
+    partitions = 0
+    for directory in sorted(glob(os.path.join(dataset_dir, "county=*", "month=*"))):
+        count = compact_partition(directory)
+        if count:
+            merged += count
+            partitions += 1
+    print(f"Compacted {merged} part files in {partitions} partitions of {dataset_dir}")
+
+
+def read_decisions(dataset_dir, columns=None, counties=None, months=None):
+    """Load decisions as a DataFrame, reading only the given columns and partitions.
+
+    columns may include "county" and "month" (the partition keys); pronounced_date comes back as datetime64."""
+    paths = []
+    for county_dir in sorted(glob(os.path.join(dataset_dir, "county=*"))):
+        if counties is not None and county_dir.split("county=", 1)[1] not in counties:
+            continue
+        for month_dir in sorted(glob(os.path.join(county_dir, "month=*"))):
+            if months is not None and month_dir.split("month=", 1)[1] not in months:
+                continue
+            paths.extend(partition_files(month_dir))
+    if not paths:
+        return pd.DataFrame(columns=columns or SCHEMA.names + ["county", "month"])
+
+    # Explicit schema: files written before a column existed are read with that column empty
+    schema = SCHEMA.append(pa.field("county", pa.string())).append(pa.field("month", pa.string()))
+    dataset = ds.dataset(paths, schema=schema, format="parquet", partitioning=PARTITIONING,
+                         partition_base_dir=dataset_dir)
+    table = dataset.to_table(columns=columns)
+    for key in PARTITION_KEYS:
+        if key in table.column_names:
+            # A few dozen distinct values: dictionary-encoded, so they become pandas categoricals
+            table = table.set_column(table.column_names.index(key), key, table[key].dictionary_encode())
+    return table.to_pandas(date_as_object=False)
+
+
+def convert_csv_folder(csv_dir, dataset_dir):
+    """One-off import of the existing <County>/<Month>.csv files"""
+    for csv_path in sorted(glob(os.path.join(csv_dir, "*", "*.csv"))):
+        county = os.path.basename(os.path.dirname(csv_path))
+        month = os.path.splitext(os.path.basename(csv_path))[0]
+        df = pd.read_csv(csv_path, dtype=str, encoding='utf-8')
+        decisions = df.astype(object).where(df.notna(), None).to_dict('records')
+        append_decisions(dataset_dir, county, month, decisions)
+        print(f"Converted {county}/{month}.csv ({len(decisions)} decisions)")
+    compact_dataset(dataset_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the partitioned Parquet copy of the bulletin decisions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compact_parser = subparsers.add_parser("compact", help="Merge the small part files of every partition")
+    compact_parser.add_argument("dataset", nargs="?", default="bulletins-analysis/counties-parquet")
+    convert_parser = subparsers.add_parser("convert", help="Import <County>/<Month>.csv files")
+    convert_parser.add_argument("csv_folder", nargs="?", default="bulletins-analysis/counties-new")
+    convert_parser.add_argument("dataset", nargs="?", default="bulletins-analysis/counties-parquet")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        compact_dataset(args.dataset)
+    else:
+        convert_csv_folder(args.csv_folder, args.dataset)
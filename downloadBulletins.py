@@ -1,16 +1,41 @@
 import requests
 import os
+import sys
 import time
-import random
 import re
+import hashlib
+import threading
 from requests.exceptions import RequestException
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from glob import glob
+from rateController import ThreadRateLimiter
+from bulletinManifest import BulletinManifest, manifest_path
 
 BASE_URL = "https://api.berc.onrc.ro/backoffice/api/publication"
 DMS_URL = "https://dms.berc.onrc.ro"
 OUTPUT_DIR = "bulletins"
 MAX_GAP_SIZE = 10
+MAX_BULLETINS_PER_YEAR = 100000
+MAX_CONSECUTIVE_FAILURES = 100
+BULLETIN_WINDOW = 8  # Bulletins in flight per year
+CONCURRENT_YEARS = 3
+RATE_INITIAL_LIMIT = 4
+RATE_MAX_LIMIT = 16
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Shared by every download thread; adapts concurrency to the API instead of fixed back-off delays
+rate_limiter = ThreadRateLimiter(RATE_INITIAL_LIMIT, RATE_MAX_LIMIT)
+
+manifest = None
+manifest_lock = threading.Lock()
+
+
+def get_manifest():
+    global manifest
+    with manifest_lock:
+        if manifest is None:
+            manifest = BulletinManifest(manifest_path(OUTPUT_DIR))
+        return manifest
 
 
 def get_headers(auth_token):
@@ -25,7 +50,7 @@ def get_headers(auth_token):
 def get_publication_info(year, number, auth_token):
     url = f"{BASE_URL}/getPublicationByYearAndNumber"
     data = {"number": number, "year": year}
-    response = requests.post(url, headers=get_headers(auth_token), json=data)
+    response = rate_limiter.call(lambda: requests.post(url, headers=get_headers(auth_token), json=data))
     if response.status_code == 200 and response.json():
         return response.json()[0]
     return None
@@ -34,7 +59,7 @@ def get_publication_info(year, number, auth_token):
 def get_download_link(document_id, auth_token):
     url = f"{BASE_URL}/viewPublication"
     data = {"documentId": document_id, "type": "BULETIN"}
-    response = requests.post(url, headers=get_headers(auth_token), json=data)
+    response = rate_limiter.call(lambda: requests.post(url, headers=get_headers(auth_token), json=data))
     if response.status_code == 200:
         return response.json().get("downloadLink")
     return None
@@ -47,21 +72,80 @@ def extract_csrf_token(html_content):
     return None
 
 
+def checksum_path(pdf_path):
+    return pdf_path + ".sha256"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+
+def write_checksum(pdf_path, checksum):
+    with open(checksum_path(pdf_path), "w") as f:
+        f.write(f"{checksum}  {os.path.basename(pdf_path)}\n")
+
+
+def read_checksum(pdf_path):
+    try:
+        with open(checksum_path(pdf_path)) as f:
+            return f.read().split()[0]
+    except (FileNotFoundError, IndexError):
+        return None
+
+
+def discard_partial_file(partial_path, reason):
+    """Delete a .part file that cannot be resumed, so the next attempt downloads from the start without Range"""
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+    raise RequestException(f"{reason}; restarting the download")
+
+
+def content_range_start(file_response):
+    match = re.match(r"bytes\s+(\d+)-", file_response.headers.get('Content-Range', ''))
+    return int(match.group(1)) if match else None
+
+
+def stream_to_partial_file(file_response, partial_path, resume_from):
+    """Write the response body to partial_path (appending after resume_from bytes) and return its SHA-256"""
+    digest = file_sha256(partial_path) if resume_from else hashlib.sha256()
+    written = resume_from
+    with open(partial_path, "ab" if resume_from else "wb") as f:
+        for chunk in file_response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
+            digest.update(chunk)
+            written += len(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+
+    # With a Content-Encoding the header counts the encoded bytes, not the decoded ones written here
+    content_length = file_response.headers.get('Content-Length')
+    encoding = file_response.headers.get('Content-Encoding', 'identity').lower()
+    if content_length is not None and encoding == 'identity' and written != resume_from + int(content_length):
+        discard_partial_file(partial_path, f"Incomplete download: {written} of {resume_from + int(content_length)} bytes")
+    return digest.hexdigest()
+
+
 def download_bulletin(year, number, download_link, auth_token, max_retries=5):
     output_dir = os.path.join(OUTPUT_DIR, str(year))
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, f"{number}.pdf")
 
     session = requests.Session()
+    last_error = None
 
     for attempt in range(max_retries):
         try:
-            response = session.get(download_link)
+            response = rate_limiter.call(lambda: session.get(download_link))
             response.raise_for_status()
 
             csrf_token = extract_csrf_token(response.text)
             if not csrf_token:
                 print(f"Failed to extract CSRF token for bulletin {year}/{number}")
+                get_manifest().mark_failed(year, number, "CSRF token not found")
                 return False
 
             temp_token = download_link.split('token=')[1].split('&')[0]
@@ -79,38 +163,102 @@ def download_bulletin(year, number, download_link, auth_token, max_retries=5):
                 "Referer": download_link
             }
 
-            file_response = session.post(download_url, data=download_data, headers=download_headers)
-            file_response.raise_for_status()
-
-            content_type = file_response.headers.get('Content-Type', '').lower()
-            if 'application/pdf' not in content_type:
-                print(f"Warning: Content-Type is not PDF for bulletin {year}/{number}. Got: {content_type}")
-                return False
-
-            with open(output_path, "wb") as f:
-                f.write(file_response.content)
-            print(f"Downloaded bulletin {year}/{number}")
+            # A .part file left by an interrupted attempt is resumed with a Range request
+            partial_path = output_path + ".part"
+            resume_from = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+            if resume_from:
+                download_headers["Range"] = f"bytes={resume_from}-"
+
+            file_response = rate_limiter.call(
+                lambda: session.post(download_url, data=download_data, headers=download_headers, stream=True))
+            with file_response:
+                if file_response.status_code == 416:
+                    # The .part is already complete (or longer than the file); it cannot be verified, so start over
+                    discard_partial_file(partial_path, f"Range not satisfiable at {resume_from} bytes")
+                file_response.raise_for_status()
+
+                content_type = file_response.headers.get('Content-Type', '').lower()
+                if 'application/pdf' not in content_type:
+                    print(f"Warning: Content-Type is not PDF for bulletin {year}/{number}. Got: {content_type}")
+                    get_manifest().mark_failed(year, number, f"Content-Type {content_type}")
+                    return False
+
+                if file_response.status_code != 206:
+                    resume_from = 0  # Server ignored the Range header and sent the whole file
+                elif content_range_start(file_response) != resume_from:
+                    discard_partial_file(partial_path, f"Content-Range {file_response.headers.get('Content-Range')} "
+                                                       f"does not continue at {resume_from} bytes")
+                checksum = stream_to_partial_file(file_response, partial_path, resume_from)
+
+            # Only complete files get the final name, so a partial write never looks like a download
+            os.replace(partial_path, output_path)
+            write_checksum(output_path, checksum)
+            get_manifest().mark_downloaded(year, number, checksum, os.path.getsize(output_path))
+            print(f"Downloaded bulletin {year}/{number}" + (f" (resumed at {resume_from} bytes)" if resume_from else ""))
             return True
 
         except RequestException as e:
-            wait_time = (2 ** attempt) + random.uniform(0, 1)
+            last_error = f"{type(e).__name__}: {e}"
+            wait_time = rate_limiter.retry_delay()
             print(f"Attempt {attempt + 1} failed for bulletin {year}/{number}. Retrying in {wait_time:.2f} seconds...")
             time.sleep(wait_time)
 
     print(f"Failed to download bulletin {year}/{number} after {max_retries} attempts")
+    get_manifest().mark_failed(year, number, last_error)
     return False
 
 
 def get_downloaded_bulletins(year):
+    manifest = get_manifest()
     year_dir = os.path.join(OUTPUT_DIR, str(year))
-    if not os.path.exists(year_dir):
-        return set()
-    files = glob(os.path.join(year_dir, "*.pdf"))
-    return set(int(os.path.splitext(os.path.basename(f))[0]) for f in files)
+    # PDFs on disk without a manifest row (older downloads, files added by hand) are registered on every run
+    if os.path.exists(year_dir):
+        imported = manifest.import_directory(year, year_dir, read_checksum)
+        if imported:
+            print(f"Registered {imported} existing bulletins for year {year} in the manifest")
+    return manifest.downloaded_numbers(year)
+
+
+def verify_pdf(pdf_path):
+    """Return None if the PDF looks complete and matches its recorded checksum, otherwise the reason"""
+    size = os.path.getsize(pdf_path)
+    with open(pdf_path, "rb") as f:
+        if f.read(5) != b"%PDF-":
+            return "missing %PDF- header"
+        f.seek(max(0, size - 2048))
+        if b"%%EOF" not in f.read():
+            return "missing %%EOF trailer (truncated)"
+
+    expected = read_checksum(pdf_path)
+    if expected and file_sha256(pdf_path).hexdigest() != expected:
+        return "SHA-256 mismatch"
+    return None
+
+
+def verify_year(year, quarantine=True):
+    """Check every downloaded PDF of a year. Corrupt files are renamed to .corrupt so the gap recovery
+    downloads them again; valid files without a checksum (older downloads) get one."""
+    year_dir = os.path.join(OUTPUT_DIR, str(year))
+    corrupt = []
+    for pdf_path in sorted(glob(os.path.join(year_dir, "*.pdf"))):
+        reason = verify_pdf(pdf_path)
+        if reason:
+            corrupt.append(pdf_path)
+            print(f"Corrupt bulletin {pdf_path}: {reason}")
+            if quarantine:
+                os.replace(pdf_path, pdf_path + ".corrupt")
+                number = int(os.path.splitext(os.path.basename(pdf_path))[0])
+                get_manifest().mark_failed(int(year), number, reason, status="corrupt")
+        elif read_checksum(pdf_path) is None:
+            write_checksum(pdf_path, file_sha256(pdf_path).hexdigest())
+
+    print(f"Verified year {year}: {len(corrupt)} corrupt bulletin(s)")
+    return corrupt
 
 
 def process_bulletin(args):
     year, number, auth_token = args
+    get_manifest().record_attempt(year, number)
     publication_info = get_publication_info(year, number, auth_token)
     if publication_info:
         document_id = publication_info.get("versionId")
@@ -118,49 +266,68 @@ def process_bulletin(args):
             download_link = get_download_link(document_id, auth_token)
             if download_link:
                 return number if download_bulletin(year, number, download_link, auth_token) else None
+            get_manifest().mark_failed(year, number, "No download link", status="missing")
+            return None
+    get_manifest().mark_failed(year, number, "Publication not found", status="missing")
     return None
 
 
-def process_year(year, auth_token):
-    downloaded_bulletins = get_downloaded_bulletins(year)
-    start_number = max(downloaded_bulletins) + 1 if downloaded_bulletins else 1
-    max_bulletins = 100000
-
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        bulletin_args = [(year, number, auth_token) for number in range(start_number, max_bulletins + 1)]
-        futures = [executor.submit(process_bulletin, args) for args in bulletin_args]
-
-        consecutive_failures = 0
-        max_consecutive_failures = 100
-        last_successful = start_number - 1
-
-        for future in as_completed(futures):
-            result = future.result()
-            if result:
+def process_year(year, auth_token, executor):
+    get_downloaded_bulletins(year)
+    start_number = get_manifest().last_downloaded(year) + 1
+
+    # Only BULLETIN_WINDOW bulletins are submitted at a time; results are evaluated in bulletin order,
+    # so the end of the year is detected after MAX_CONSECUTIVE_FAILURES misses regardless of timing.
+    numbers = iter(range(start_number, MAX_BULLETINS_PER_YEAR + 1))
+    in_flight = {}
+    finished = {}
+    next_number = start_number
+    consecutive_failures = 0
+    last_successful = start_number - 1
+
+    def submit_next():
+        number = next(numbers, None)
+        if number is None:
+            return False
+        in_flight[executor.submit(process_bulletin, (year, number, auth_token))] = number
+        return True
+
+    while len(in_flight) < BULLETIN_WINDOW and submit_next():
+        pass
+
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            finished[in_flight.pop(future)] = future.result() is not None
+
+        while next_number in finished:
+            if finished.pop(next_number):
                 consecutive_failures = 0
-                last_successful = max(last_successful, result)
+                last_successful = next_number
             else:
                 consecutive_failures += 1
+            next_number += 1
+
+        if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+            print(f"Reached {MAX_CONSECUTIVE_FAILURES} consecutive failures for year {year}. Moving to next year.")
+            for future in in_flight:
+                future.cancel()
+            wait(in_flight)
+            break
 
-            if consecutive_failures >= max_consecutive_failures:
-                print(f"Reached {max_consecutive_failures} consecutive failures for year {year}. Moving to next year.")
-                break
+        while len(in_flight) < BULLETIN_WINDOW and submit_next():
+            pass
 
     # Recovery for small gaps
-    all_downloaded = get_downloaded_bulletins(year)
-    gaps = []
-    for i in range(1, last_successful + 1):
-        if i not in all_downloaded:
-            gaps.append(i)
+    gaps = get_manifest().gaps(year, last_successful)
 
     if gaps:
         print(f"Found {len(gaps)} gaps in year {year}. Attempting to recover...")
         for gap_start in range(0, len(gaps), MAX_GAP_SIZE):
             gap_end = min(gap_start + MAX_GAP_SIZE, len(gaps))
             gap_range = gaps[gap_start:gap_end]
-            with ThreadPoolExecutor(max_workers=MAX_GAP_SIZE) as executor:
-                gap_args = [(year, number, auth_token) for number in gap_range]
-                list(executor.map(process_bulletin, gap_args))
+            gap_args = [(year, number, auth_token) for number in gap_range]
+            list(executor.map(process_bulletin, gap_args))
 
     return last_successful > start_number
 
@@ -172,20 +339,35 @@ def main():
     years_without_bulletins = 0
     max_years_without_bulletins = 3
 
-    while years_without_bulletins < max_years_without_bulletins:
-        print(f"Processing year: {current_year}")
-        bulletins_found = process_year(current_year, auth_token)
+    # One pool for bulletin jobs shared by the years processed side by side
+    with ThreadPoolExecutor(max_workers=BULLETIN_WINDOW * CONCURRENT_YEARS) as executor, \
+            ThreadPoolExecutor(max_workers=CONCURRENT_YEARS) as year_executor:
+        while years_without_bulletins < max_years_without_bulletins:
+            years = list(range(current_year, current_year - CONCURRENT_YEARS, -1))
+            print(f"Processing years: {', '.join(map(str, years))}")
+            results = list(year_executor.map(lambda year: process_year(year, auth_token, executor), years))
+
+            for year, bulletins_found in zip(years, results):
+                if not bulletins_found:
+                    years_without_bulletins += 1
+                    print(f"No bulletins found for year {year}. Years without bulletins: {years_without_bulletins}")
+                else:
+                    years_without_bulletins = 0  # Reset counter if we found bulletins
 
-        if not bulletins_found:
-            years_without_bulletins += 1
-            print(f"No bulletins found for year {current_year}. Years without bulletins: {years_without_bulletins}")
-        else:
-            years_without_bulletins = 0  # Reset counter if we found bulletins
+                if years_without_bulletins >= max_years_without_bulletins:
+                    break
 
-        current_year -= 1
+            current_year -= CONCURRENT_YEARS
 
     print(f"No bulletins found for {max_years_without_bulletins} consecutive years. Stopping.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "verify":
+        # python downloadBulletins.py verify [year ...]
+        year_folders = sorted(name for name in os.listdir(OUTPUT_DIR)
+                              if name.isdigit() and os.path.isdir(os.path.join(OUTPUT_DIR, name)))
+        for verify_year_arg in sys.argv[2:] or year_folders:
+            verify_year(verify_year_arg)
+    else:
+        main()
\ No newline at end of file
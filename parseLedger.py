@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# Which bulletins an output folder already holds rows for, so re-runs only parse new or changed files.
+# A file is current when its size and mtime (or, if those changed, its SHA-256) and the parser version
+# match what was recorded. Entries are written as 'pending' with the partitions (county, month) about to
+# receive rows and become 'done' once the rows are saved; anything still pending after a crash is treated
+# as changed, so its partial rows are removed before it is parsed again.
+LEDGER_FILENAME = "ledger.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    source TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    parser_version TEXT NOT NULL,
+    status TEXT NOT NULL,
+    decision_count INTEGER,
+    partitions TEXT NOT NULL,
+    processed_at TEXT
+);
+"""
+
+
+def ledger_path(output_directory):
+    return os.path.join(output_directory, LEDGER_FILENAME)
+
+
+def source_id(file_path):
+    """'<year>/<number>.pdf': the key in the ledger and the source_file column of every output row"""
+    return "/".join(os.path.normpath(os.path.abspath(file_path)).split(os.sep)[-2:])
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseLedger:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def check(self, file_path, parser_version):
+        """("current" | "new" | "changed", file state to record once the file is parsed)"""
+        source = source_id(file_path)
+        stat = os.stat(file_path)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, sha256, parser_version, status FROM files WHERE source = ?",
+                (source,)).fetchone()
+
+        state = {"source": source, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if row is None:
+            state["sha256"] = file_sha256(file_path)
+            return "new", state
+
+        size, mtime_ns, sha256, version, status = row
+        if status == "done" and version == parser_version and (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            state["sha256"] = sha256
+            return "current", state
+
+        state["sha256"] = file_sha256(file_path)
+        if status == "done" and version == parser_version and sha256 == state["sha256"]:
+            # Touched or copied but identical: only the recorded stat changes
+            with self.lock:
+                self.connection.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE source = ?",
+                                        (stat.st_size, stat.st_mtime_ns, source))
+                self.connection.commit()
+            return "current", state
+        return "changed", state
+
+    def partitions_of(self, sources):
+        """(county, month) -> sources with rows in that partition, for the given sources"""
+        partitions = {}
+        with self.lock:
+            for source in sources:
+                row = self.connection.execute("SELECT partitions FROM files WHERE source = ?", (source,)).fetchone()
+                for county, month in json.loads(row[0]) if row else []:
+                    partitions.setdefault((county, month), []).append(source)
+        return partitions
+
+    def forget(self, sources):
+        with self.lock:
+            self.connection.executemany("DELETE FROM files WHERE source = ?", [(source,) for source in sources])
+            self.connection.commit()
+
+    def begin(self, entries, parser_version):
+        """Record files whose rows are about to be written (entry: state + decision_count + partitions)"""
+        with self.lock:
+            self.connection.executemany("""
+                INSERT OR REPLACE INTO files
+                    (source, size, mtime_ns, sha256, parser_version, status, decision_count, partitions, processed_at)
+                VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)
+            """, [(entry["source"], entry["size"], entry["mtime_ns"], entry["sha256"], parser_version,
+                   entry["decision_count"], json.dumps(entry["partitions"]), datetime.now().isoformat())
+                  for entry in entries])
+            self.connection.commit()
+
+    def commit(self, entries):
+        with self.lock:
+            self.connection.executemany("UPDATE files SET status = 'done' WHERE source = ?",
+                                        [(entry["source"],) for entry in entries])
+            self.connection.commit()
@@ -0,0 +1,102 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+# Decision counts per (county, day, registrator name as written) for every counties-new/<County>/<Month>.csv,
+# so the performance report only reads the CSV files that are new or changed since the last run.
+# Names are kept as written (the name-variant tallies); the report normalizes them, so a change to the
+# normalization does not require reading the CSV files again.
+AGGREGATES_FILENAME = 'performance-aggregates.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS partitions (
+    partition TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    decisions INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    partition TEXT NOT NULL,
+    county TEXT NOT NULL,
+    pronounced_date TEXT NOT NULL,
+    original_name TEXT NOT NULL,
+    decisions INTEGER NOT NULL,
+    PRIMARY KEY (partition, pronounced_date, original_name)
+);
+"""
+
+
+def partition_of(file_path):
+    """'<County>/<Month>.csv'"""
+    return "/".join(os.path.normpath(file_path).split(os.sep)[-2:])
+
+
+def daily_counts(df):
+    """pronounced_date (datetime64) / original_name rows -> decisions per (pronounced_date, original_name)"""
+    counts = df.groupby([df['pronounced_date'].dt.strftime('%Y-%m-%d'), 'original_name'], observed=True).size()
+    return counts.rename('decisions').reset_index()
+
+
+class PerformanceAggregates:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def stale_files(self, file_paths):
+        """Files whose size or mtime differ from when they were aggregated, or that were never aggregated"""
+        recorded = {partition: (size, mtime_ns) for partition, size, mtime_ns
+                    in self.connection.execute("SELECT partition, size, mtime_ns FROM partitions")}
+        stale = []
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            if recorded.get(partition_of(file_path)) != (stat.st_size, stat.st_mtime_ns):
+                stale.append(file_path)
+        return stale
+
+    def forget_missing(self, file_paths):
+        """Drop the counts of files that no longer exist; returns how many were dropped"""
+        present = {partition_of(file_path) for file_path in file_paths}
+        missing = [(partition,) for (partition,) in self.connection.execute("SELECT partition FROM partitions")
+                   if partition not in present]
+        self.connection.executemany("DELETE FROM daily_counts WHERE partition = ?", missing)
+        self.connection.executemany("DELETE FROM partitions WHERE partition = ?", missing)
+        self.connection.commit()
+        return len(missing)
+
+    def replace_partition(self, file_path, counts, row_count, stat=None):
+        """Replace the counts of one CSV file with counts (pronounced_date, original_name, decisions);
+        row_count is every row of the file, counted or not.
+
+        stat should be taken before the file was read, so a file changed while it was read is read again."""
+        partition = partition_of(file_path)
+        county = os.path.basename(os.path.dirname(os.path.normpath(file_path)))
+        stat = stat or os.stat(file_path)
+        rows = [(partition, county, date, name, int(decisions)) for date, name, decisions
+                in counts[['pronounced_date', 'original_name', 'decisions']].itertuples(index=False)]
+        with self.connection:
+            self.connection.execute("DELETE FROM daily_counts WHERE partition = ?", (partition,))
+            self.connection.executemany("INSERT INTO daily_counts VALUES (?, ?, ?, ?, ?)", rows)
+            self.connection.execute("INSERT OR REPLACE INTO partitions VALUES (?, ?, ?, ?, ?, ?)",
+                                    (partition, stat.st_size, stat.st_mtime_ns, row_count,
+                                     sum(row[4] for row in rows), datetime.now().isoformat()))
+
+    def total_rows(self):
+        return self.connection.execute("SELECT COALESCE(SUM(rows), 0) FROM partitions").fetchone()[0]
+
+    def daily_counts(self):
+        """county / pronounced_date (datetime64) / original_name / decisions over every aggregated file"""
+        df = pd.read_sql_query("SELECT county, pronounced_date, original_name, SUM(decisions) AS decisions "
+                               "FROM daily_counts GROUP BY county, pronounced_date, original_name",
+                               self.connection)
+        df['county'] = df['county'].astype('category')
+        df['pronounced_date'] = pd.to_datetime(df['pronounced_date'], format='%Y-%m-%d')
+        return df
@@ -0,0 +1,127 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+
+# Per-stage timings of an analyseBulletins run. Each bulletin gets a FileProfile where it is parsed (a worker
+# process or thread); the parent adds it to the run's PipelineProfile together with its own stages (queue waits,
+# writes). When profiling is off no profile objects exist and the timed code paths are not installed at all.
+STAGE_ORDER = ("total", "page_text", "pdf_open", "get_text", "parse", "county", "group", "queue_wait", "write",
+               "ledger")
+STAGE_DESCRIPTIONS = {
+    "total": "parse_file, per bulletin",
+    "page_text": "reading page text (PDF or text cache)",
+    "pdf_open": "pymupdf.open",
+    "get_text": "page.get_text",
+    "parse": "splitting and decision regexes",
+    "county": "county resolution",
+    "group": "grouping by county and month",
+    "queue_wait": "blocked on the writer queue",
+    "write": "appending rows, per flush",
+    "ledger": "ledger begin/commit, per flush",
+}
+PERCENTILES = (50, 95, 99)
+
+
+class FileProfile:
+    """Stage seconds and counters of one bulletin; plain data, so it can be returned from a worker process"""
+
+    def __init__(self):
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+
+    def add(self, stage, seconds):
+        self.stages[stage] += seconds
+
+    def count(self, counter, amount=1):
+        self.counters[counter] += amount
+
+    def timed(self, stage, function):
+        """function, with the time spent in it added to stage"""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.stages[stage] += time.perf_counter() - start
+        return wrapper
+
+    def timed_iter(self, stage, iterable):
+        """iterable, with the time spent producing each item added to stage"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.stages[stage] += time.perf_counter() - start
+                return
+            self.stages[stage] += time.perf_counter() - start
+            yield item
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    return sorted_values[max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)]
+
+
+class PipelineProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.samples = defaultdict(list)  # stage -> seconds of each bulletin / flush / put
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def add_file(self, file_profile):
+        with self.lock:
+            for stage, seconds in file_profile.stages.items():
+                self.samples[stage].append(seconds)
+            for counter, amount in file_profile.counters.items():
+                self.counters[counter] += amount
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.samples[stage].append(seconds)
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def summary(self):
+        wall = time.perf_counter() - self.started
+        with self.lock:
+            samples = {stage: sorted(values) for stage, values in self.samples.items()}
+            counters = dict(self.counters)
+
+        stages = {}
+        for stage in sorted(samples, key=lambda name: (STAGE_ORDER.index(name) if name in STAGE_ORDER else
+                                                       len(STAGE_ORDER), name)):
+            values = samples[stage]
+            stages[stage] = {"count": len(values), "total_seconds": sum(values), "max_seconds": values[-1],
+                             **{f"p{percent}_seconds": percentile(values, percent) for percent in PERCENTILES}}
+        return {
+            "wall_seconds": wall,
+            "counters": counters,
+            "decisions_per_second": counters.get("decisions", 0) / wall if wall else 0.0,
+            "bytes_per_second": counters.get("pdf_bytes", 0) / wall if wall else 0.0,
+            "stages": stages,
+        }
+
+    def report(self):
+        summary = self.summary()
+        counters = summary["counters"]
+        lines = [f"Profile: {counters.get('files', 0)} bulletins, {counters.get('decisions', 0)} decisions, "
+                 f"{counters.get('pdf_bytes', 0) / 1024 ** 2:.1f}MB of PDF in {summary['wall_seconds']:.2f}s "
+                 f"({summary['decisions_per_second']:.0f} decisions/s, "
+                 f"{summary['bytes_per_second'] / 1024 ** 2:.2f}MB/s)",
+                 f"{'stage':<12}{'count':>8}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for stage, values in summary["stages"].items():
+            lines.append(f"{stage:<12}{values['count']:>8}{values['total_seconds']:>10.2f}"
+                         + "".join(f"{values[f'p{percent}_seconds'] * 1000:>10.2f}" for percent in PERCENTILES)
+                         + f"  {STAGE_DESCRIPTIONS.get(stage, '')}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
@@ -0,0 +1,161 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# AIMD (additive increase, multiplicative decrease) concurrency control for the BERC/DMS APIs.
+# The limit grows by about one request per round of successful responses while latency stays close to
+# the best latency seen, is cut by DECREASE_FACTOR on 429/5xx/timeouts (at most once per round trip),
+# and a Retry-After header pauses every caller until the server asks us to come back.
+DECREASE_FACTOR = 0.5
+LATENCY_TOLERANCE = 2.0  # Stop growing while average latency exceeds this multiple of the best latency
+LATENCY_SMOOTHING = 0.1
+
+
+def parse_retry_after(value):
+    """Retry-After in seconds (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_congestion(status):
+    return status == 429 or status >= 500
+
+
+class AimdController:
+    def __init__(self, initial_limit, max_limit, min_limit=1):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.pause_until = 0.0
+        self.min_latency = None
+        self.latency_ewma = None
+        self.last_decrease = 0.0
+        self.decreases = 0
+        self.lock = threading.Lock()
+
+    def _can_start(self):
+        return self.in_flight < int(self.limit) and time.monotonic() >= self.pause_until
+
+    def _wait_timeout(self):
+        return max(self.pause_until - time.monotonic(), 0.05)
+
+    def _record(self, latency, status, retry_after, failed):
+        now = time.monotonic()
+        self.in_flight -= 1
+
+        retry_after = parse_retry_after(retry_after)
+        if retry_after:
+            self.pause_until = max(self.pause_until, now + retry_after)
+
+        if failed or (status is not None and is_congestion(status)):
+            # One cut per round trip, so a burst of failures from the same round does not collapse the limit
+            if now - self.last_decrease >= (self.latency_ewma or 1.0):
+                self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+                self.last_decrease = now
+                self.decreases += 1
+            return
+
+        if latency is None:
+            return
+        self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += LATENCY_SMOOTHING * (latency - self.latency_ewma)
+        if self.latency_ewma <= self.min_latency * LATENCY_TOLERANCE:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def retry_delay(self):
+        """Jittered pause before retrying; the real back-off is the lowered limit and any Retry-After pause"""
+        with self.lock:
+            base = self.latency_ewma or 0.2
+        return random.uniform(0, 2 * base)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "latency_ms": (self.latency_ewma or 0) * 1000,
+                "decreases": self.decreases,
+            }
+
+
+class ThreadRateLimiter(AimdController):
+    """Shared by worker threads: acquire() before a request, release(...) with its outcome after it"""
+
+    def __init__(self, initial_limit, max_limit, min_limit=1):
+        super().__init__(initial_limit, max_limit, min_limit)
+        self.condition = threading.Condition(self.lock)
+
+    def acquire(self):
+        with self.condition:
+            while not self._can_start():
+                self.condition.wait(timeout=self._wait_timeout())
+            self.in_flight += 1
+
+    def release(self, latency=None, status=None, retry_after=None, failed=False):
+        with self.condition:
+            self._record(latency, status, retry_after, failed)
+            self.condition.notify_all()
+
+    def call(self, send):
+        """Run send() (a requests call) in a slot and report its outcome; exceptions count as failures"""
+        self.acquire()
+        started = time.monotonic()
+        try:
+            response = send()
+        except Exception:
+            self.release(failed=True)
+            raise
+        self.release(time.monotonic() - started, response.status_code, response.headers.get('Retry-After'))
+        return response
+
+
+class AsyncRateLimiter(AimdController):
+    """Same controller for coroutines running on one event loop; release() does not need to be awaited"""
+
+    def __init__(self, initial_limit, max_limit, min_limit=1):
+        super().__init__(initial_limit, max_limit, min_limit)
+        self.waiters = deque()
+
+    async def acquire(self):
+        while True:
+            with self.lock:
+                if self._can_start():
+                    self.in_flight += 1
+                    return
+                timeout = self._wait_timeout()
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+            try:
+                # asyncio.wait, unlike wait_for, never swallows a cancellation of this task
+                await asyncio.wait((waiter,), timeout=timeout)
+            finally:
+                waiter.cancel()  # No-op if release() resolved it; otherwise release() skips it
+
+    def release(self, latency=None, status=None, retry_after=None, failed=False):
+        with self.lock:
+            self._record(latency, status, retry_after, failed)
+            free_slots = max(int(self.limit) - self.in_flight, 1)
+        while self.waiters and free_slots > 0:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free_slots -= 1
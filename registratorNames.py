@@ -0,0 +1,151 @@
+import json
+import os
+import unicodedata
+from collections import defaultdict
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from fuzzywuzzy import fuzz, utils
+
+# Normalized form of the registrator names in the decision CSVs (see normalize_text). Around 300k rows hold
+# only a few hundred distinct spellings, so each spelling is normalized once and the result is kept in
+# NAMES_FILE for the next run.
+NAMES_FILE = 'bulletins-analysis/registrator-names.json'
+NORMALIZATION_VERSION = 1  # Bump when normalize_text changes, so the saved names are normalized again
+
+
+def normalize_text(text):
+    """Change diacritics to their base form, convert to lowercase, and sort words"""
+    if pd.isna(text) or not isinstance(text, str):
+        return text
+    normalized = ''.join(c for c in unicodedata.normalize('NFD', str(text).lower())
+                         if unicodedata.category(c) != 'Mn')
+    return ' '.join(sorted(normalized.split()))
+
+
+class NameTable:
+    """original name -> normalized name, shared by every file of a run and saved between runs"""
+
+    def __init__(self, path=NAMES_FILE):
+        self.path = path
+        self.names = {}
+        self.added = 0
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('version') == NORMALIZATION_VERSION:
+                self.names = saved['names']
+
+    def normalize(self, name):
+        normalized = self.names.get(name)
+        if normalized is None:
+            normalized = self.names[name] = normalize_text(name)
+            self.added += 1
+        return normalized
+
+    def normalize_series(self, names):
+        """normalize_text of every value, computed once per distinct value and mapped back through its code"""
+        codes, uniques = pd.factorize(names)
+        normalized = np.array([self.normalize(name) for name in uniques] + [np.nan], dtype=object)
+        # Missing values have code -1, which picks the trailing NaN
+        return pd.Series(normalized[codes], index=names.index, dtype=object)
+
+    def save(self):
+        if not self.added or not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': NORMALIZATION_VERSION, 'names': self.names}, f, ensure_ascii=False, indent=0)
+        os.replace(temp_path, self.path)
+        self.added = 0
+
+
+# Entity resolution: OCR and typing variants of one registrator ("bunda mariana", "bund mariana",
+# "bunda mariana roc", "colongin dana(mi)aela") are merged under one canonical name. Candidate pairs come from
+# a blocking index (names sharing the first BLOCK_KEY_LENGTH letters of a word), so names are only compared
+# within their blocks, never all pairs; matched pairs are joined with union-find.
+CANONICAL_NAMES_FILE = 'bulletins-analysis/registrator-canonical-names.csv'
+MATCH_THRESHOLD = 92  # fuzzywuzzy score of two spellings of the same name
+BLOCK_KEY_LENGTH = 4
+MIN_KEY_WORD_LENGTH = 3  # Shorter words ("de", OCR debris) do not form blocks
+MAX_BLOCK_SIZE = 200  # Blocks of very common words are skipped; the other words of a name still block it
+MAX_NAME_LENGTH = 45  # Longer captures are parsing debris and are left out of the resolution
+
+
+def block_keys(name):
+    return {word[:BLOCK_KEY_LENGTH] for word in utils.full_process(name).split() if len(word) >= MIN_KEY_WORD_LENGTH}
+
+
+def same_registrator(name, other):
+    name, other = utils.full_process(name), utils.full_process(other)
+    # ratio catches characters misread inside a word, token_sort_ratio words split differently by OCR debris
+    if max(fuzz.ratio(name, other), fuzz.token_sort_ratio(name, other)) >= MATCH_THRESHOLD:
+        return True
+    # Every word of the shorter name appears in the longer one ("bunda mariana" / "bunda mariana roc")
+    return len(min(name, other, key=len).split()) >= 2 and fuzz.token_set_ratio(name, other) == 100
+
+
+def candidate_pairs(names):
+    """Index pairs of names sharing a block key"""
+    blocks = defaultdict(list)
+    for index, name in enumerate(names):
+        for key in block_keys(name):
+            blocks[key].append(index)
+    pairs = set()
+    for members in blocks.values():
+        if len(members) <= MAX_BLOCK_SIZE:
+            pairs.update(combinations(members, 2))
+    return pairs
+
+
+def resolve_registrators(decision_counts):
+    """normalized name -> canonical name; decision_counts maps normalized names to their number of decisions.
+    The canonical name of a group is its name with the most decisions."""
+    names = sorted(name for name in decision_counts if len(name) <= MAX_NAME_LENGTH)
+    parents = list(range(len(names)))
+
+    def root(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    for first, second in candidate_pairs(names):
+        if root(first) != root(second) and same_registrator(names[first], names[second]):
+            parents[root(first)] = root(second)
+
+    groups = defaultdict(list)
+    for index, name in enumerate(names):
+        groups[root(index)].append(name)
+    canonical = {name: name for name in decision_counts}
+    for members in groups.values():
+        best = min(members, key=lambda name: (-decision_counts[name], name))
+        canonical.update((name, best) for name in members)
+    return canonical
+
+
+def save_canonical_names(canonical, decision_counts, path=CANONICAL_NAMES_FILE):
+    """Write the mapping for other tools (see canonical_registrators)"""
+    df = pd.DataFrame({'normalized_name': list(canonical), 'canonical_name': list(canonical.values())})
+    df['decisions'] = df['normalized_name'].map(decision_counts)
+    df = df.sort_values(['canonical_name', 'decisions'], ascending=[True, False])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    df.to_csv(path, index=False, encoding='utf-8')
+
+
+def load_canonical_names(path=CANONICAL_NAMES_FILE):
+    if not os.path.exists(path):
+        return {}
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8')
+    return dict(zip(df['normalized_name'], df['canonical_name']))
+
+
+def canonical_registrators(registrators, name_table=None, canonical=None):
+    """Canonical names for a registrator column of the analysis CSVs, from the mapping saved by the last
+    performance report; names it has not seen keep their normalized form"""
+    name_table = name_table or NameTable()
+    canonical = load_canonical_names() if canonical is None else canonical
+    normalized = name_table.normalize_series(registrators.astype(str).str.replace('-', ' ').where(registrators.notna()))
+    return normalized.map(lambda name: canonical.get(name, name) if isinstance(name, str) else name)
@@ -0,0 +1,141 @@
+import json
+import os
+import sys
+
+from countyStorage import records_path, find_records_file, append_records, convert_json_file, storage_format_of, \
+    load_checkpoint, write_checkpoint, record_number
+
+# Settings and helpers shared by the threaded engine (main.py) and the async engine (asyncScraper.py).
+# Both engines read the settings through this module, so a change made at runtime (e.g. by the benchmarks)
+# applies to whichever engine runs.
+
+# Variables to customize
+OUTPUT_FOLDER = "results"
+MAX_APPLICATION_NUMBER = 380001
+SAVE_FREQUENCY = 250  # Save after every 10 successful requests
+MAX_RETRIES = 2
+MAX_EMPTY_COUNT = 1500
+STATUS_UPDATE_INTERVAL = 1  # seconds
+THREAD_MULTIPLIER = 1.5
+ENGINE = "async"  # "async" (shared connection pool) or "threads" (one worker per county)
+MAX_IN_FLIGHT = 64  # Upper bound for requests in flight across all counties
+RATE_INITIAL_LIMIT = 8  # Starting concurrency; the rate controller adapts it between 1 and MAX_IN_FLIGHT
+COUNTY_WINDOW = 16  # Application numbers in flight per county (async engine)
+DISCOVERY_WORKERS = 32  # publicitySituations workers (async engine)
+DETAIL_WORKERS = 32  # filter-article workers (async engine)
+DETAIL_QUEUE_SIZE = 256  # Discovered publicity ids waiting for a detail worker (async engine)
+API_BASE_URL = "https://api.berc.onrc.ro"
+STORAGE_FORMAT = "jsonl"  # "jsonl", "jsonl.gz" (append-only) or "json" (legacy, rewritten on every save)
+
+
+def log_error(error_data):
+    with open('errors.txt', 'a') as f:
+        f.write(json.dumps(error_data, indent=2) + "\n\n")
+
+    # Also write a text version for easier debugging
+    with open('errors_debug.txt', 'a') as f:
+        f.write(f"Timestamp: {error_data['timestamp']}\n")
+        f.write(f"URL: {error_data['url']}\n")
+        f.write(f"Payload: {json.dumps(error_data['payload'], indent=2)}\n")
+        f.write(f"Error Type: {error_data['error_type']}\n")
+        f.write(f"Error Message: {error_data['error_message']}\n")
+        f.write(f"Attempt: {error_data['attempt']}\n")
+        if 'response_content' in error_data:
+            f.write(f"Response Content: {error_data['response_content']}\n")
+
+        f.write("\n" + "-" * 50 + "\n\n")
+
+
+def first_request(county, application_number):
+    url = f"{API_BASE_URL}/client/api/publicitySituations"
+    county_data = {k: v for k, v in county.items() if k != 'mnemonic'}
+    payload = {
+        "county": county_data,
+        "fiscalCode": "",
+        "applicationNumber": str(application_number),
+        "applicationYear": "2024",
+        "name": "",
+        "listType": "notAll"
+    }
+    return url, payload
+
+
+def second_request(publicity_id, application_number, county):
+    url = f"{API_BASE_URL}/backoffice/api/article/filter-article?all=notAll&page=0&pageSize=10"
+    county_data = {k: v for k, v in county.items() if k != 'mnemonic'}
+    payload = {
+        "county": county_data,
+        "publicityId": publicity_id,
+        "applicationNumber": str(application_number),
+        "applicationYear": "2024",
+        "name": "",
+        "listType": "notAll"
+    }
+    return url, payload
+
+
+def save_results(county, results):
+    county_folder = os.path.join(OUTPUT_FOLDER, "counties")
+    os.makedirs(county_folder, exist_ok=True)
+    filename = records_path(county_folder, county['name'], STORAGE_FORMAT)
+    checkpoint = load_checkpoint(filename)
+
+    if STORAGE_FORMAT == "json":
+        existing_data = []
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                existing_data = json.load(f)
+
+        existing_data.extend(results)
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(existing_data, f, ensure_ascii=False, indent=4)
+        file_size = os.path.getsize(filename)
+    else:
+        file_size = append_records(filename, results)
+
+    # The checkpoint is replaced only after the records are on disk
+    last_processed = record_number(results[-1]) if results else None
+    checkpoint = write_checkpoint(filename, last_processed or checkpoint["last_processed"],
+                                  checkpoint["record_count"] + len(results), file_size)
+    print(f"\nSaved {len(results)} new records to {filename}. Total records: {checkpoint['record_count']}")
+
+
+def get_last_processed_number(county):
+    last_processed = 0
+    successful_requests = 0
+
+    try:
+        county_folder = os.path.join(OUTPUT_FOLDER, "counties")
+        filename = find_records_file(county_folder, county['name']) if os.path.isdir(county_folder) else None
+
+        # Move a legacy .json file over to the append-only format before appending to it
+        if filename and filename.endswith(".json") and STORAGE_FORMAT != "json":
+            filename, _ = convert_json_file(filename, compress=STORAGE_FORMAT == "jsonl.gz", remove_source=True)
+            print(f"Converted existing results for {county['name']} to {filename}")
+
+        if filename and storage_format_of(filename) != STORAGE_FORMAT:
+            raise ValueError(f"{filename} does not match STORAGE_FORMAT '{STORAGE_FORMAT}'")
+
+        if filename:
+            checkpoint = load_checkpoint(filename)
+            last_processed = checkpoint["last_processed"]
+            successful_requests = checkpoint["record_count"]
+
+    except Exception as e:
+        print(f"Error while reading last processed number for {county['name']}: {e}")
+        # Shut down all processes
+        sys.exit(1)
+
+    return last_processed, successful_requests
+
+
+def get_headers(authorization_key):
+    return {
+        "Accept": "application/json, text/plain, */*",
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {authorization_key}",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+        "Origin": "https://portal.berc.onrc.ro",
+        "Referer": "https://portal.berc.onrc.ro/"
+    }
@@ -0,0 +1,99 @@
+import argparse
+import gzip
+import json
+import os
+import threading
+
+import pymupdf
+
+# Content-addressed cache of the text pymupdf extracts from each bulletin page, so changes to the
+# decision parser can be re-run without extracting the PDFs again:
+#   <cache>/<sha[:2]>/<sha256 of the PDF>-pymupdf-<version>.jsonl.gz   (one JSON string per page)
+# Entries are written atomically while the pages stream through; reading an entry refreshes its mtime,
+# which evict() uses to drop the least recently used entries once the cache exceeds its size limit.
+TEXT_CACHE_FOLDER = "text-cache"
+TEXT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+EXTRACTOR_VERSION = f"pymupdf-{pymupdf.__version__}"
+
+counts = {"hits": 0, "misses": 0}
+counts_lock = threading.Lock()
+
+
+def cache_path(cache_dir, sha256):
+    return os.path.join(cache_dir, sha256[:2], f"{sha256}-{EXTRACTOR_VERSION}.jsonl.gz")
+
+
+def count(outcome):
+    with counts_lock:
+        counts[outcome] += 1
+
+
+def stats():
+    with counts_lock:
+        return {"text_cache_hits": counts["hits"], "text_cache_misses": counts["misses"]}
+
+
+def read_pages(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def is_cached(cache_dir, sha256):
+    return os.path.exists(cache_path(cache_dir, sha256))
+
+
+def cached_pages(cache_dir, sha256, extract_pages):
+    """Page texts from the cache, or from extract_pages() while they are written to the cache"""
+    path = cache_path(cache_dir, sha256)
+    if os.path.exists(path):
+        count("hits")
+        os.utime(path)
+        yield from read_pages(path)
+        return
+
+    count("misses")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    complete = False
+    try:
+        with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            for page_text in extract_pages():
+                f.write(json.dumps(page_text, ensure_ascii=False) + "\n")
+                yield page_text
+        os.replace(temp_path, path)
+        complete = True
+    finally:
+        # Extraction failed or the caller stopped early: never leave a partial entry behind
+        if not complete and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def evict(cache_dir, max_bytes=TEXT_CACHE_MAX_BYTES):
+    """Delete least recently used entries until the cache fits in max_bytes; returns bytes freed"""
+    entries = []
+    total = 0
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            total += stat.st_size
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        os.remove(path)
+        freed += size
+    if freed:
+        print(f"Text cache: evicted {freed / 1024 ** 2:.1f}MB, {(total - freed) / 1024 ** 2:.1f}MB kept")
+    return freed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trim the extracted-text cache to its size limit")
+    parser.add_argument("cache_dir", nargs="?", default=os.path.join("bulletins", TEXT_CACHE_FOLDER))
+    parser.add_argument("--max-mb", type=float, default=TEXT_CACHE_MAX_BYTES / 1024 ** 2)
+    args = parser.parse_args()
+    evict(args.cache_dir, int(args.max_mb * 1024 ** 2))
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+# Registrator throughput metrics computed in one pass over the categorical codes of the decision rows:
+# every registrator × day and county × day count comes from a single np.bincount, and the per-registrator
+# figures (days worked, percentiles of daily throughput, best rolling 7/30-day totals, modal spelling of the
+# name) are read off those matrices instead of separate groupbys with Python callbacks.
+# The decision rows only carry the day a decision was pronounced (the bulletins print no time), so no hourly
+# rate can be measured: dossiers_per_hour is dossiers_per_day spread over an assumed 8-hour working day.
+HOURS_PER_DAY = 8
+DAILY_PERCENTILES = (50, 90, 99)  # Of the decisions on the days a registrator worked
+ROLLING_WINDOWS = (7, 30)  # Calendar days
+MAX_DENSE_NAME_CELLS = 50_000_000  # Above this registrators × names, modal names are counted sparsely
+
+
+def codes_of(column):
+    """Categorical codes and the categories in use of a column (converted if it is not categorical yet)"""
+    categorical = column.astype('category')
+    codes = categorical.cat.codes.to_numpy()
+    # Same as cat.remove_unused_categories(), which sorts all the codes to find the used ones
+    used = np.bincount(codes[codes >= 0], minlength=len(categorical.cat.categories)) > 0
+    if used.all():
+        return codes, categorical.cat.categories
+    new_codes = np.where(used, np.cumsum(used) - 1, -1).astype(codes.dtype)
+    return np.where(codes >= 0, new_codes[codes], -1), categorical.cat.categories[used]
+
+
+def count_matrix(codes, category_count, day_index, day_count, weights):
+    counts = np.bincount(codes.astype(np.int64) * day_count + day_index, weights=weights,
+                         minlength=category_count * day_count)
+    return np.rint(counts).astype(np.int64).reshape(category_count, day_count)
+
+
+def trailing_sums(daily, window):
+    """Sum of the window days ending on each day"""
+    cumulative = np.concatenate([np.zeros((daily.shape[0], 1), dtype=np.int64), daily.cumsum(axis=1)], axis=1)
+    ends = np.arange(1, daily.shape[1] + 1)
+    return cumulative[:, ends] - cumulative[:, np.maximum(ends - window, 0)]
+
+
+def modal_codes(codes, name_codes, name_count, weights, group_count):
+    """Most frequent name code of every group; ties go to the lowest code (first name alphabetically)"""
+    named = name_codes >= 0
+    if not named.all():
+        codes, name_codes = codes[named], name_codes[named]
+        weights = weights[named] if weights is not None else None
+    if group_count * name_count <= MAX_DENSE_NAME_CELLS:
+        tallies = np.bincount(codes.astype(np.int64) * name_count + name_codes, weights=weights,
+                              minlength=group_count * name_count).reshape(group_count, name_count)
+        return tallies.argmax(axis=1)
+    keys, inverse = np.unique(codes.astype(np.int64) * name_count + name_codes, return_inverse=True)
+    tallies = np.bincount(inverse, weights=weights)
+    order = np.lexsort((keys % name_count, -tallies, keys // name_count))
+    groups = keys[order] // name_count
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = groups[1:] != groups[:-1]
+    return keys[order][first] % name_count
+
+
+def daily_table(daily, categories, first_day, name, rolling):
+    """Long table of the non-zero cells of a category × day matrix"""
+    rows, days = np.nonzero(daily)
+    table = pd.DataFrame({
+        name: pd.Categorical.from_codes(rows, categories),
+        'date': (first_day + days).astype('datetime64[D]').astype('datetime64[s]'),
+        'decisions': daily[rows, days],
+    })
+    for window, sums in rolling.items():
+        table[f'rolling_{window}_days'] = sums[rows, days]
+    return table
+
+
+def registrator_metrics(df, weight_column=None):
+    """Throughput metrics of the rows of df (registrator, county, original_name, pronounced_date as datetime64).
+
+    Each row counts as one decision, or as weight_column decisions when df holds pre-aggregated counts.
+    Returns (summary per registrator, registrator × day table, county × day table). Dates are days, so
+    dossiers_per_hour is only dossiers_per_day / HOURS_PER_DAY, not a measured rate."""
+    df = df[df['registrator'].notna() & df['pronounced_date'].notna()]
+    registrator_codes, registrators = codes_of(df['registrator'])
+    county_codes, counties = codes_of(df['county'])
+    name_codes, names = codes_of(df['original_name'])
+    weights = df[weight_column].to_numpy(dtype=np.float64) if weight_column else None
+
+    days = df['pronounced_date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    first_day = days.min()
+    day_index = days - first_day
+    day_count = int(day_index.max()) + 1
+
+    daily = count_matrix(registrator_codes, len(registrators), day_index, day_count, weights)
+    county_mask = county_codes >= 0
+    county_daily = count_matrix(county_codes[county_mask], len(counties), day_index[county_mask], day_count,
+                                weights[county_mask] if weights is not None else None)
+
+    worked = daily > 0
+    days_worked = worked.sum(axis=1)
+    dossiers = daily.sum(axis=1)
+    summary = pd.DataFrame({
+        'most_frequent_name': names[modal_codes(registrator_codes, name_codes, len(names), weights,
+                                                len(registrators))],
+        'days_worked': days_worked,
+        'dossiers_processed': dossiers,
+    }, index=pd.CategoricalIndex(registrators, name='registrator'))
+    summary['dossiers_per_day'] = summary['dossiers_processed'] / summary['days_worked']
+    summary['dossiers_per_hour'] = summary['dossiers_per_day'] / HOURS_PER_DAY
+
+    worked_counts = np.where(worked, daily, np.nan)
+    for percent, values in zip(DAILY_PERCENTILES, np.nanpercentile(worked_counts, DAILY_PERCENTILES, axis=1)):
+        summary[f'daily_p{percent}'] = values
+
+    rolling = {window: trailing_sums(daily, window) for window in ROLLING_WINDOWS}
+    for window, sums in rolling.items():
+        summary[f'best_{window}_days'] = sums.max(axis=1)
+
+    county_rolling = {window: trailing_sums(county_daily, window) for window in ROLLING_WINDOWS}
+    return (summary,
+            daily_table(daily, registrators, first_day, 'registrator', rolling),
+            daily_table(county_daily, counties, first_day, 'county', county_rolling))
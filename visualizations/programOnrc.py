@@ -1,15 +1,17 @@
 import json
 import os
-from datetime import datetime
+import sys
 import matplotlib.pyplot as plt
-from collections import defaultdict
-import pytz
+import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from countyColumns import load_county_columns
+from countyStorage import list_county_files
 
-def load_json_file(file_path):
+
+def load_county_file(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        return load_county_columns(file_path)
     except FileNotFoundError:
         print(f"File not found: {file_path}")
         return None
@@ -18,38 +20,26 @@ def load_json_file(file_path):
         return None
 
 
-def parse_date(date_string):
-    if date_string:
-        try:
-            # Parse the date and convert to Romanian time
-            date = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
-            romanian_tz = pytz.timezone('Europe/Bucharest')
-            return date.astimezone(romanian_tz)
-        except ValueError:
-            return None
-    return None
-
+def hourly_counts(hours, labels):
+    """label -> number of rows per hour of day (24 values), for the labels that occur"""
+    codes, uniques = labels.factorize()
+    counts = np.bincount(codes * 24 + hours, minlength=len(uniques) * 24).reshape(len(uniques), 24)
+    return dict(zip(uniques, counts))
 
-def process_county_data(county, data):
-    hour_frequency = defaultdict(lambda: defaultdict(int))
-    resolution_frequency = defaultdict(lambda: defaultdict(int))
-    source_codes = set()
-    resolution_types = set()
 
-    for item in data:
-        resolution_date = parse_date(item.get('resolutionDate'))
-        source_code = item.get('sourceCode', 'Unknown')
-        resolution = item.get('resolution')
+def process_county_data(county, df):
+    df = df[df['resolution_date'].notna()]
+    resolution_dates = df['resolution_date'].to_numpy()
+    hours = (resolution_dates.astype('datetime64[h]') - resolution_dates.astype('datetime64[D]')).astype(np.int64)
 
-        if resolution_date:
-            hour_frequency[resolution_date.hour][source_code] += 1
-            source_codes.add(source_code)
+    source_codes = df['source_code'].astype(object).fillna('Unknown')
+    hour_frequency = hourly_counts(hours, source_codes)
 
-            if resolution:
-                resolution_frequency[resolution_date.hour][resolution] += 1
-                resolution_types.add(resolution)
+    resolutions = df['resolution'].astype(object)
+    resolved = (resolutions.notna() & (resolutions != '')).to_numpy()
+    resolution_frequency = hourly_counts(hours[resolved], resolutions[resolved])
 
-    return hour_frequency, source_codes, resolution_frequency, resolution_types
+    return hour_frequency, set(hour_frequency), resolution_frequency, set(resolution_frequency)
 
 
 def visualize_county_data(county, hour_frequency, source_codes, resolution_frequency, resolution_types):
@@ -62,7 +52,7 @@ def visualize_county_data(county, hour_frequency, source_codes, resolution_frequ
     bottom = np.zeros(24)
 
     for i, source_code in enumerate(source_codes):
-        frequencies = [hour_frequency[hour][source_code] for hour in hours]
+        frequencies = hour_frequency[source_code]
         plt.bar(hours, frequencies, bottom=bottom, label=source_code, color=colors[i])
         bottom += frequencies
 
@@ -85,7 +75,7 @@ def visualize_county_data(county, hour_frequency, source_codes, resolution_frequ
     colors = plt.cm.get_cmap('Set2')(np.linspace(0, 1, len(resolution_types)))
 
     for i, resolution_type in enumerate(resolution_types):
-        frequencies = [resolution_frequency[hour][resolution_type] for hour in hours]
+        frequencies = resolution_frequency[resolution_type]
         plt.bar(hours, frequencies, bottom=bottom, label=resolution_type, color=colors[i])
         bottom += frequencies
 
@@ -104,19 +94,14 @@ def visualize_county_data(county, hour_frequency, source_codes, resolution_frequ
 
 def process_all_counties():
     counties_dir = "../results/counties"
-    for file_name in os.listdir(counties_dir):
-        if file_name.endswith(".json"):
-            county = file_name[:-5]  # Remove .json extension
-            file_path = os.path.join(counties_dir, file_name)
-            data = load_json_file(file_path)
-            if data:
-                hour_frequency, source_codes, resolution_frequency, resolution_types = process_county_data(county, data)
-                visualize_county_data(county, hour_frequency, source_codes, resolution_frequency, resolution_types)
-                print(f"Processed and visualized data for {county}")
+    for county, file_path in list_county_files(counties_dir).items():
+        df = load_county_file(file_path)
+        if df is not None and len(df):
+            hour_frequency, source_codes, resolution_frequency, resolution_types = process_county_data(county, df)
+            visualize_county_data(county, hour_frequency, source_codes, resolution_frequency, resolution_types)
+            print(f"Processed and visualized data for {county}")
 
 
 if __name__ == "__main__":
-    import numpy as np
-
     process_all_counties()
     print("All counties processed. Check the 'img/programme-decisions/' directory for output PNG files.")
\ No newline at end of file
@@ -1,13 +1,16 @@
 import json
 import os
+import sys
 import matplotlib.pyplot as plt
-import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from countyColumns import load_county_columns
+from countyStorage import list_county_files
 
-def load_json_file(file_path):
+
+def load_county_file(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        return load_county_columns(file_path)
     except FileNotFoundError:
         print(f"File not found: {file_path}")
         return None
@@ -16,22 +19,12 @@ def load_json_file(file_path):
         return None
 
 
-def process_county_data(data):
-    total_cases = 0
-    delayed_cases = 0
-    admitted_cases = 0
-    denied_cases = 0
-
-    for item in data:
-        resolution = item.get('resolution')
-        if resolution == 'Admis':
-            admitted_cases += 1
-            total_cases += 1
-        elif resolution == 'Respins':
-            denied_cases += 1
-            total_cases += 1
-        elif resolution == 'Amânat':
-            delayed_cases += 1
+def process_county_data(df):
+    counts = df['resolution'].value_counts()
+    admitted_cases = int(counts.get('Admis', 0))
+    denied_cases = int(counts.get('Respins', 0))
+    delayed_cases = int(counts.get('Amânat', 0))
+    total_cases = admitted_cases + denied_cases
 
     return {
         'Delayed': delayed_cases,
@@ -80,15 +73,12 @@ def visualize_county_data(county, data):
 
 def process_all_counties():
     counties_dir = "../results/counties"
-    for file_name in os.listdir(counties_dir):
-        if file_name.endswith(".json"):
-            county = file_name[:-5]  # Remove .json extension
-            file_path = os.path.join(counties_dir, file_name)
-            data = load_json_file(file_path)
-            if data:
-                outcome_data = process_county_data(data)
-                visualize_county_data(county, outcome_data)
-                print(f"Processed and visualized outcome data for {county}")
+    for county, file_path in list_county_files(counties_dir).items():
+        df = load_county_file(file_path)
+        if df is not None and len(df):
+            outcome_data = process_county_data(df)
+            visualize_county_data(county, outcome_data)
+            print(f"Processed and visualized outcome data for {county}")
 
 
 if __name__ == "__main__":
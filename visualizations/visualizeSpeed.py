@@ -1,16 +1,17 @@
 import json
 import os
-from datetime import datetime
+import sys
 import matplotlib.pyplot as plt
-from collections import defaultdict
-import pytz
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from countyColumns import load_county_columns
+from countyStorage import list_county_files
 
-def load_json_file(file_path):
+
+def load_county_file(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        return load_county_columns(file_path)
     except FileNotFoundError:
         print(f"File not found: {file_path}")
         return None
@@ -19,31 +20,19 @@ def load_json_file(file_path):
         return None
 
 
-def parse_date(date_string):
-    if date_string:
-        try:
-            date = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
-            romanian_tz = pytz.timezone('Europe/Bucharest')
-            return date.astimezone(romanian_tz)
-        except ValueError:
-            return None
-    return None
-
-
-def process_county_data(data):
-    processing_time = defaultdict(lambda: defaultdict(int))
-    decision_types = {'Admis', 'Respins', 'Amânat'}
-
-    for item in data:
-        resolution_date = parse_date(item.get('resolutionDate'))
-        application_date = parse_date(item.get('applicationDate'))
-        resolution = item.get('resolution')
-
-        if application_date and resolution_date and resolution in decision_types:
-            processing_days = (resolution_date.date() - application_date.date()).days
-            processing_days = min(processing_days, 31)  # Group all 31+ days together
-            processing_time[processing_days][resolution] += 1
+def process_county_data(df):
+    """decision type -> number of decisions taken after 0, 1, ..., 31+ days (dates in Romanian time)"""
+    decision_types = ['Admis', 'Respins', 'Amânat']
+    df = df[df['resolution_date'].notna() & df['application_date'].notna() & df['resolution'].isin(decision_types)]
+    processing_days = (df['resolution_date'].to_numpy().astype('datetime64[D]')
+                       - df['application_date'].to_numpy().astype('datetime64[D]')).astype(np.int64)
+    processing_days = np.minimum(processing_days, 31)  # Group all 31+ days together
+    resolutions = df['resolution'].to_numpy()
 
+    processing_time = {}
+    for decision in decision_types:
+        days = processing_days[(resolutions == decision) & (processing_days >= 0)]
+        processing_time[decision] = np.bincount(days, minlength=32)
     return processing_time
 
 
@@ -55,7 +44,7 @@ def visualize_county_data(county, processing_time):
 
     bottom = np.zeros(32)
     for decision in decision_types:
-        frequencies = [processing_time[day][decision] for day in days]
+        frequencies = processing_time[decision]
         plt.bar(days, frequencies, bottom=bottom, label=decision, color=colors[decision])
         bottom += frequencies
 
@@ -74,15 +63,12 @@ def visualize_county_data(county, processing_time):
 
 def process_all_counties():
     counties_dir = "../results/counties"
-    for file_name in os.listdir(counties_dir):
-        if file_name.endswith(".json"):
-            county = file_name[:-5]  # Remove .json extension
-            file_path = os.path.join(counties_dir, file_name)
-            data = load_json_file(file_path)
-            if data:
-                processing_time = process_county_data(data)
-                visualize_county_data(county, processing_time)
-                print(f"Processed and visualized decision speed data for {county}")
+    for county, file_path in list_county_files(counties_dir).items():
+        df = load_county_file(file_path)
+        if df is not None and len(df):
+            processing_time = process_county_data(df)
+            visualize_county_data(county, processing_time)
+            print(f"Processed and visualized decision speed data for {county}")
 
 
 if __name__ == "__main__":